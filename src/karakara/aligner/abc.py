@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
+from collections.abc import Sequence
 from dataclasses import dataclass
 
 from karakara.typ import NpAudioData, NpAudioSamples
@@ -11,6 +12,8 @@ from karakara.utils.io import DEFAULT_SAMPLE_RATE
 class AlignedWord:
     word: str
     position: tuple[int, int] | None = None
+    # 词在对齐文本中的字符区间 [start, end)，对齐器不提供时为 None
+    span: tuple[int, int] | None = None
 
 
 class AbstractAligner(ABC):
@@ -25,3 +28,44 @@ class AbstractAligner(ABC):
         sample_rate: int = DEFAULT_SAMPLE_RATE,
     ) -> list[AlignedWord]:
         raise NotImplementedError
+
+    def align_batch(
+        self,
+        audios: Sequence[NpAudioData | NpAudioSamples],
+        texts: Sequence[str],
+        sample_rate: int = DEFAULT_SAMPLE_RATE,
+    ) -> list[list[AlignedWord]]:
+        """批量对齐多段音频，返回结果与输入一一对应。
+
+        默认实现逐段调用 :meth:`align`；能合并请求或并发的实现应覆盖此方法，
+        以摊薄每次调用的固定开销。
+        """
+        if len(audios) != len(texts):
+            raise ValueError(
+                f"audios and texts length mismatch: {len(audios)} != {len(texts)}"
+            )
+        return [
+            self.align(audio, text, sample_rate) for audio, text in zip(audios, texts)
+        ]
+
+    def align_many(
+        self,
+        audio: NpAudioData | NpAudioSamples,
+        segments: Sequence[tuple[int, int | None, str]],
+        sample_rate: int = DEFAULT_SAMPLE_RATE,
+    ) -> list[list[AlignedWord]]:
+        """在同一段音频上对齐多个片段。
+
+        默认实现按片段切出音频后调用 :meth:`align_batch`；
+        能一次提交整段音频 + 全部文本的实现应覆盖此方法。
+
+        Args:
+            audio: 完整音频
+            segments: (start_sample, end_sample, text) 列表，end 为 None 表示到音频末尾
+            sample_rate: 采样率
+
+        Returns:
+            与 segments 一一对应的对齐结果，时间相对于各片段起点（毫秒）
+        """
+        pieces = [audio[..., start:end] for start, end, _ in segments]
+        return self.align_batch(pieces, [text for _, _, text in segments], sample_rate)
@@ -11,18 +11,96 @@ gentle_client.py
 
 from __future__ import annotations
 
-import io
+import json
 import logging
+import random
 import time
+from collections.abc import Callable
+from functools import lru_cache
 from os import PathLike
 from pathlib import Path
-from typing import Any
+from typing import IO, Any
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    # 可选依赖（karakara[fast]）：安装后以流式 multipart 上传，
+    # 不必先在内存里拼出包含整段音频的请求体
+    from requests_toolbelt import MultipartEncoder
+except ImportError:
+    MultipartEncoder = None  # type: ignore[assignment,misc]
+
+try:
+    # 可选依赖：align.json 动辄几百 KB 的词条，orjson 解析明显快于标准库
+    import orjson
+
+    _loads: Callable[[bytes], Any] = orjson.loads
+except ImportError:
+    _loads = json.loads
 
 logger = logging.getLogger(__name__)
 
 
+def _parse_json(resp: requests.Response) -> Any:
+    """解析响应体 JSON，直接解析原始字节而不先解码成 str。"""
+    return _loads(resp.content)
+
+
+class _BufferReader:
+    """把内存缓冲区包装成只读文件对象，供 MultipartEncoder 分块读取。
+
+    MultipartEncoder 会把 bytes / bytearray 复制进一个 BytesIO，
+    这里改为按需从 memoryview 切出每一块，不复制整段数据。
+    ``__len__`` 返回剩余字节数，MultipartEncoder 据此计算进度和 Content-Length。
+    """
+
+    def __init__(self, buf: bytes | bytearray) -> None:
+        self._view = memoryview(buf)
+        self._pos = 0
+
+    def __len__(self) -> int:
+        return len(self._view) - self._pos
+
+    def read(self, size: int | None = -1) -> bytes:
+        end = len(self._view)
+        if size is not None and size >= 0:
+            end = min(end, self._pos + size)
+        chunk = self._view[self._pos : end].tobytes()
+        self._pos = end
+        return chunk
+
+
+# 默认 Session 连接池大小，应不小于并发对齐的线程数
+DEFAULT_POOL_SIZE = 32
+
+
+@lru_cache(maxsize=1)
+def default_session() -> requests.Session:
+    """
+    进程内共享的 requests.Session，挂载了带连接池和重试的 HTTPAdapter。
+
+    未显式传入 session 的 GentleClient 都使用它，多个客户端 / 对齐器实例
+    因此共享同一组 keep-alive 连接，不必每次提交都重新建立 TCP 连接。
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=DEFAULT_POOL_SIZE,
+        pool_maxsize=DEFAULT_POOL_SIZE,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.2,
+            status_forcelist=[502, 503, 504],
+            # 重试耗尽后返回最后一次响应，交给调用方按状态码处理
+            raise_on_status=False,
+        ),
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
 class GentleClient:
     """
     Gentle HTTP API client.
@@ -39,15 +117,24 @@ class GentleClient:
         base_url: str = "http://localhost:8765",
         timeout: float | None = 30.0,
         session: requests.Session | None = None,
+        initial_poll_interval: float = 0.25,
+        max_poll_interval: float = 10.0,
+        poll_jitter: float = 0.5,
     ) -> None:
         """
         :param base_url: 服务根地址（例如 http://localhost:8765）
         :param timeout: 默认单次请求超时（秒）。对可能耗时很长的同步提交，可传 None。
-        :param session: 可选的 requests.Session（便于复用连接）
+        :param session: 可选的 requests.Session；为 None 时使用共享的 default_session()
+        :param initial_poll_interval: poll_status 的初始轮询间隔（秒），之后每次翻倍
+        :param max_poll_interval: poll_status 轮询间隔的上限（秒）
+        :param poll_jitter: 轮询间隔的随机抖动比例，实际间隔在 [1-j, 1+j] 倍之间
         """
         self.base_url = base_url.rstrip("/")
         self.timeout = timeout
-        self.session = session or requests.Session()
+        self.session = session or default_session()
+        self.initial_poll_interval = initial_poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.poll_jitter = poll_jitter
 
     def _build_submit_fields(
         self, transcript: str = "", disfluency: bool = False, conservative: bool = False
@@ -108,7 +195,7 @@ class GentleClient:
 
     def submit_bytes_async(
         self,
-        audio_bytes: bytes,
+        audio_bytes: bytes | bytearray,
         filename: str = "upload",
         transcript: str = "",
         disfluency: bool = False,
@@ -119,8 +206,7 @@ class GentleClient:
         与 submit_async 等价，但使用内存中的字节作为上传内容。
         """
         url = f"{self.base_url}/transcriptions"
-        bio = io.BytesIO(audio_bytes)
-        files = {"audio": (filename, bio)}
+        files = {"audio": (filename, audio_bytes)}
         data = self._build_submit_fields(transcript, disfluency, conservative)
         resp = self.session.post(
             url,
@@ -157,23 +243,19 @@ class GentleClient:
         :return: 服务器返回的 JSON 解析结果
         :raises: requests.HTTPError
         """
-        url = f"{self.base_url}/transcriptions"
         with open(str(audio_path), "rb") as f:
-            files = {"audio": (Path(audio_path).name, f)}
-            data = self._build_submit_fields(transcript, disfluency, conservative)
-            data["async"] = "false"
-            resp = self.session.post(
-                url,
-                files=files,
-                data=data,
-                timeout=(self.timeout if timeout is None else timeout),
+            return self.submit_file_sync(
+                f,
+                filename=Path(audio_path).name,
+                transcript=transcript,
+                disfluency=disfluency,
+                conservative=conservative,
+                timeout=timeout,
             )
-        resp.raise_for_status()
-        return resp.json()  # type: ignore
 
     def submit_bytes_sync(
         self,
-        audio_bytes: bytes,
+        audio_bytes: bytes | bytearray,
         filename: str = "upload",
         transcript: str = "",
         disfluency: bool = False,
@@ -183,20 +265,73 @@ class GentleClient:
         """
         与 submit_sync 类似，但使用字节数据上传。
         """
+        return self.submit_file_sync(
+            audio_bytes,
+            filename=filename,
+            transcript=transcript,
+            disfluency=disfluency,
+            conservative=conservative,
+            timeout=timeout,
+        )
+
+    def submit_file_sync(
+        self,
+        fileobj: IO[bytes] | bytes | bytearray,
+        filename: str = "upload",
+        transcript: str = "",
+        disfluency: bool = False,
+        conservative: bool = False,
+        timeout: float | None = None,
+        content_type: str | None = None,
+    ) -> dict[str, Any]:
+        """
+        同步提交任意文件对象或字节缓冲区。
+
+        若安装了 requests_toolbelt（``karakara[fast]``），请求体边读边发送（流式 multipart）：
+        文件对象不必整体读入内存，字节缓冲区也不会被拷进拼好的请求体。
+        否则内容原样交给 requests 组装 multipart 请求体。
+
+        :param fileobj: 已定位到起始处的二进制文件对象，或 bytes / bytearray
+        :param filename: multipart 中的文件名，服务端据此推断格式
+        :param content_type: 可选的 Content-Type，例如 "audio/wav"
+        :return: 服务器返回的 JSON 解析结果
+        :raises: requests.HTTPError
+        """
         url = f"{self.base_url}/transcriptions"
-        bio = io.BytesIO(audio_bytes)
-        files = {"audio": (filename, bio)}
         data = self._build_submit_fields(transcript, disfluency, conservative)
         data["async"] = "false"
-        resp = self.session.post(
-            url,
-            files=files,
-            data=data,
-            timeout=(self.timeout if timeout is None else timeout),
-        )
+        if MultipartEncoder is not None:
+            body = (
+                _BufferReader(fileobj)
+                if isinstance(fileobj, (bytes, bytearray))
+                else fileobj
+            )
+            stream_part = (
+                (filename, body)
+                if content_type is None
+                else (filename, body, content_type)
+            )
+            encoder = MultipartEncoder(fields=[*data.items(), ("audio", stream_part)])
+            resp = self.session.post(
+                url,
+                data=encoder,
+                headers={"Content-Type": encoder.content_type},
+                timeout=(self.timeout if timeout is None else timeout),
+            )
+        else:
+            part = (
+                (filename, fileobj)
+                if content_type is None
+                else (filename, fileobj, content_type)
+            )
+            resp = self.session.post(
+                url,
+                files={"audio": part},
+                data=data,
+                timeout=(self.timeout if timeout is None else timeout),
+            )
         resp.raise_for_status()
-        result = resp.json()
-        return result  # type: ignore
+        return _parse_json(resp)  # type: ignore[no-any-return]
 
     def get_status(self, uid: str, timeout: float | None = None) -> dict[str, Any]:
         """
@@ -210,36 +345,91 @@ class GentleClient:
             url, timeout=(self.timeout if timeout is None else timeout)
         )
         resp.raise_for_status()
-        return resp.json()  # type: ignore
+        return _parse_json(resp)  # type: ignore[no-any-return]
 
     def poll_status(
-        self, uid: str, interval: float = 2.0, timeout: float = 300.0
+        self,
+        uid: str,
+        interval: float | None = None,
+        timeout: float = 300.0,
+        long_poll: bool = False,
+        long_poll_wait: float = 30.0,
     ) -> dict[str, Any]:
         """
         轮询 status.json，直到 status 字段为 OK 或 ERROR，或超时。
 
+        轮询间隔按指数退避增长（上限 max_poll_interval）并叠加随机抖动：
+        长任务的请求数从 O(T/interval) 降到 O(log T)，
+        多个任务的轮询也不会同步成一波一波地打到服务端。
+        连接错误、请求超时和 5xx 视为暂时故障，同样退避后重试，而不是立即抛出。
+
+        ``long_poll=True`` 时带上 ``?wait=<秒>`` 发起长轮询，由服务端挂起请求直到
+        状态变化或等待超时，完成后几乎立即返回。原版 Gentle 服务不认识 ``wait``，
+        若首个请求立即返回了未完成的状态，就退回上面的退避轮询；
+        之后的请求提前返回（例如状态从排队变为处理中）属于正常唤醒，不影响长轮询。
+
         :param uid: transcription uid
-        :param interval: 轮询间隔（秒）
+        :param interval: 初始轮询间隔（秒），None 时使用 initial_poll_interval
         :param timeout: 最大等待时间（秒）
+        :param long_poll: 是否尝试 HTTP 长轮询（需要服务端或代理支持 wait 参数）
+        :param long_poll_wait: 单次长轮询让服务端最多挂起的时间（秒）
         :return: 最终的 status JSON 字典
-        :raises: TimeoutError
+        :raises: TimeoutError, requests.HTTPError (4xx)
         """
         url = f"{self.base_url}/transcriptions/{uid}/status.json"
+        delay = self.initial_poll_interval if interval is None else interval
         start = time.time()
+        # 只凭首个长轮询响应判断服务端是否认识 wait 参数
+        probed = False
         while True:
-            resp = self.session.get(url, timeout=self.timeout)
-            if resp.status_code == 200:
-                status = resp.json()
-                st = str(status.get("status", "")).upper()
-                if st in ("OK", "ERROR"):
-                    return status  # type: ignore
+            held = False
+            wait = min(long_poll_wait, max(0.0, timeout - (time.time() - start)))
+            sent = time.time()
+            try:
+                if long_poll:
+                    resp = self.session.get(
+                        url, params={"wait": f"{wait:g}"}, timeout=wait + 5
+                    )
+                else:
+                    resp = self.session.get(url, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                logger.warning(f"polling status for {uid} failed, backing off: {e}")
             else:
-                resp.raise_for_status()
+                if resp.status_code == 200:
+                    status = _parse_json(resp)
+                    st = str(status.get("status", "")).upper()
+                    if st in ("OK", "ERROR"):
+                        return status  # type: ignore
+                    if long_poll:
+                        held = True
+                        if not probed:
+                            probed = True
+                            if time.time() - sent < wait / 2:
+                                logger.debug(
+                                    "server returned immediately, long polling "
+                                    "unsupported; falling back to backoff polling"
+                                )
+                                long_poll = False
+                                held = False
+                elif resp.status_code >= 500:
+                    logger.warning(
+                        f"polling status for {uid} got HTTP {resp.status_code}, "
+                        "backing off"
+                    )
+                else:
+                    resp.raise_for_status()
             if (time.time() - start) > timeout:
                 raise TimeoutError(
                     f"Polling status for {uid} timed out after {timeout} seconds"
                 )
-            time.sleep(interval)
+            if held:
+                # 服务端支持长轮询，会自行挂起请求，直接发起下一次
+                continue
+            time.sleep(
+                min(self.max_poll_interval, delay)
+                * random.uniform(1 - self.poll_jitter, 1 + self.poll_jitter)
+            )
+            delay *= 2
 
     def download_align_json(
         self, uid: str, dest_path: PathLike, timeout: float | None = None
@@ -1,16 +1,50 @@
 from __future__ import annotations
 
-from io import BytesIO
+from bisect import bisect_right
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Literal
 
-import numpy as np
 import requests
 from typing_extensions import override
 
 from karakara.typ import NpAudioData, NpAudioSamples
-from karakara.utils.io import DEFAULT_SAMPLE_RATE, save_audio
+from karakara.utils.io import DEFAULT_SAMPLE_RATE, encode_flac, encode_wav
 
 from ..abc import AbstractAligner, AlignedWord
-from .client import GentleClient
+from .client import DEFAULT_POOL_SIZE, GentleClient
+
+
+def _to_aligned_word(
+    w: dict[str, Any],
+    time_base: float = 0.0,
+    char_base: int = 0,
+) -> AlignedWord:
+    """把 Gentle 返回的单词转换为 AlignedWord。
+
+    Args:
+        w: Gentle 结果中 ``words`` 的一项
+        time_base: 从时间中减去的基准（秒）
+        char_base: 从字符偏移中减去的基准
+
+    Returns:
+        时间为毫秒的 AlignedWord
+    """
+    position = None
+    if w["case"] == "success":
+        # 先在秒上换算基准，再四舍五入到毫秒，只取整一次；
+        # 直接 int() 截断会把 1.15 * 1000 = 1149.999... 算成 1149
+        position = (
+            round((w["start"] - time_base) * 1000),
+            round((w["end"] - time_base) * 1000),
+        )
+    # 兼容不返回字符偏移的服务端，缺失时交给调用方按文本查找
+    span = None
+    start_offset, end_offset = w.get("startOffset"), w.get("endOffset")
+    if start_offset is not None and end_offset is not None:
+        span = (start_offset - char_base, end_offset - char_base)
+    return AlignedWord(word=w["word"], position=position, span=span)
 
 
 class GentleAligner(AbstractAligner):
@@ -18,8 +52,35 @@ class GentleAligner(AbstractAligner):
         self,
         base_url: str = "http://localhost:8765",
         session: requests.Session | None = None,
+        max_workers: int = 8,
+        upload_format: Literal["wav", "flac"] = "wav",
     ) -> None:
         self._client = GentleClient(base_url=base_url, timeout=None, session=session)
+        if session is None:
+            # 并发数超过连接池上限时，多出的线程只能等连接或新建一次性连接
+            max_workers = min(max_workers, DEFAULT_POOL_SIZE)
+        self._max_workers = max_workers
+        # flac 无损且上传体积约为 wav 的一半，但要多一次编码
+        self._upload_format = upload_format
+
+    def _submit(
+        self,
+        audio: NpAudioData,
+        text: str,
+        sample_rate: int,
+    ) -> list[dict[str, Any]]:
+        if self._upload_format == "flac":
+            payload: bytes | bytearray = encode_flac(audio, sample_rate)
+            filename, content_type = "vocal.flac", "audio/flac"
+        else:
+            payload = encode_wav(audio, sample_rate)
+            filename, content_type = "vocal.wav", "audio/wav"
+        return self._client.submit_file_sync(  # type: ignore[no-any-return]
+            payload,
+            filename=filename,
+            transcript=text,
+            content_type=content_type,
+        )["words"]
 
     @override
     def align(
@@ -29,26 +90,79 @@ class GentleAligner(AbstractAligner):
         sample_rate: int = DEFAULT_SAMPLE_RATE,
     ) -> list[AlignedWord]:
         if audio.ndim == 1:
-            audio = np.expand_dims(audio, axis=0)
+            audio = audio.reshape(1, -1)
         elif audio.ndim == 2:
             pass
         else:
             raise ValueError(f"bad audio ndarray dim: {audio.ndim}, 1 or 2 expected")
 
-        buffer = BytesIO()
-        save_audio(buffer, audio, sample_rate)
-        result: list[AlignedWord] = []
-        for w in self._client.submit_bytes_sync(buffer.getvalue(), transcript=text)[
-            "words"
-        ]:
-            result.append(
-                AlignedWord(
-                    word=w["word"],
-                    position=(
-                        (int(w["start"] * 1e3), int(w["end"] * 1e3))
-                        if w["case"] == "success"
-                        else None
-                    ),
+        return [_to_aligned_word(w) for w in self._submit(audio, text, sample_rate)]
+
+    @override
+    def align_batch(
+        self,
+        audios: Sequence[NpAudioData | NpAudioSamples],
+        texts: Sequence[str],
+        sample_rate: int = DEFAULT_SAMPLE_RATE,
+    ) -> list[list[AlignedWord]]:
+        """并发提交各段对齐请求。
+
+        每段都是一次独立的同步 HTTP 请求，耗时基本都在等服务端，
+        用线程池让多段同时在 Gentle 服务端处理。
+        """
+        if len(audios) != len(texts):
+            raise ValueError(
+                f"audios and texts length mismatch: {len(audios)} != {len(texts)}"
+            )
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            return list(
+                executor.map(
+                    partial(self.align, sample_rate=sample_rate), audios, texts
                 )
             )
+
+    @override
+    def align_many(
+        self,
+        audio: NpAudioData | NpAudioSamples,
+        segments: Sequence[tuple[int, int | None, str]],
+        sample_rate: int = DEFAULT_SAMPLE_RATE,
+    ) -> list[list[AlignedWord]]:
+        """整段音频 + 全部文本一次提交，再按文本偏移把词分回各片段。
+
+        Gentle 本身就面向长音频 + 完整转录稿，一次提交省去了逐段的
+        WAV 编码、HTTP 往返和服务端解码器初始化。
+        返回的时间已换算为相对各片段起点（即 start_sample 处），
+        与逐段切片后调用 :meth:`align` 的结果一致。
+        """
+        if not segments:
+            return []
+        if audio.ndim == 1:
+            audio = audio.reshape(1, -1)
+        elif audio.ndim != 2:
+            raise ValueError(f"bad audio ndarray dim: {audio.ndim}, 1 or 2 expected")
+
+        # 各片段文本在拼接后转录稿中的起始偏移
+        line_offsets: list[int] = []
+        offset = 0
+        for _, _, text in segments:
+            line_offsets.append(offset)
+            offset += len(text) + 1
+        transcript = "\n".join(text for _, _, text in segments)
+        # 以片段起始采样点为基准（秒），不经毫秒取整，避免两次取整累积误差
+        seg_start_s = [start / sample_rate for start, _, _ in segments]
+
+        result: list[list[AlignedWord]] = [[] for _ in segments]
+        for w in self._submit(audio, transcript, sample_rate):
+            if (start_offset := w.get("startOffset")) is not None:
+                i = bisect_right(line_offsets, start_offset) - 1
+            elif w["case"] == "success":
+                # 没有字符偏移时按时间归入片段
+                i = max(bisect_right(seg_start_s, w["start"]) - 1, 0)
+            else:
+                # 既无偏移也无时间的词无法归属，本来也不会被用到
+                continue
+            result[i].append(
+                _to_aligned_word(w, time_base=seg_start_s[i], char_base=line_offsets[i])
+            )
         return result
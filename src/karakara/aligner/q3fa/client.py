@@ -4,7 +4,7 @@ q3fa_client.py
 Qwen3-ForcedAligner HTTP API 客户端（基于 requests），带类型注解。
 
 API 端点：
-- POST /align  — 提交音频+文本进行强制对齐，返回逐词时间戳
+- POST /align  — 提交音频+文本进行强制对齐，返回逐词时间戳（支持多段批量）
 - GET  /health — 健康检查
 
 供其他脚本或程序 import 使用。
@@ -14,6 +14,7 @@ from __future__ import annotations
 
 import io
 import logging
+from collections.abc import Sequence
 from os import PathLike
 from pathlib import Path
 
@@ -109,7 +110,7 @@ class Q3FAClient:
 
     def align_bytes(
         self,
-        audio_bytes: bytes,
+        audio_bytes: bytes | bytearray,
         text: str,
         language: str = "Chinese",
         filename: str = "upload.wav",
@@ -138,3 +139,42 @@ class Q3FAClient:
         )
         resp.raise_for_status()
         return resp.json()  # type: ignore[no-any-return]
+
+    def align_bytes_batch(
+        self,
+        audios: Sequence[bytes | bytearray],
+        texts: Sequence[str],
+        language: str = "Chinese",
+        timeout: float | None = None,
+    ) -> list[Q3FAResponse]:
+        """
+        在一次请求中提交多段音频字节进行批量强制对齐。
+
+        :param audios: 各段音频文件的原始字节
+        :param texts: 与各段音频一一对应的参考文本
+        :param language: 语言 (Chinese/English/French/German/...)，对所有段生效
+        :param timeout: 覆盖默认超时
+        :return: 与输入顺序一致的 AlignResponse 列表
+        :raises: requests.HTTPError
+        """
+        if len(audios) != len(texts):
+            raise ValueError(
+                f"audios and texts length mismatch: {len(audios)} != {len(texts)}"
+            )
+        url = f"{self.base_url}/align"
+        files = [
+            ("audio", (f"upload_{i}.wav", io.BytesIO(b))) for i, b in enumerate(audios)
+        ]
+        data: dict[str, list[str] | str] = {"text": list(texts), "language": language}
+        resp = self.session.post(
+            url,
+            files=files,
+            data=data,
+            timeout=(self.timeout if timeout is None else timeout),
+        )
+        resp.raise_for_status()
+        result = resp.json()
+        # 只有一段时服务端按单样本处理，返回的是单个对象
+        if isinstance(result, dict):
+            return [result]  # type: ignore[list-item]
+        return result  # type: ignore[no-any-return]
@@ -1,16 +1,15 @@
 from __future__ import annotations
 
-from io import BytesIO
+from collections.abc import Sequence
 
-import numpy as np
 import requests
 from typing_extensions import override
 
 from karakara.typ import NpAudioData, NpAudioSamples
-from karakara.utils.io import DEFAULT_SAMPLE_RATE, save_audio
+from karakara.utils.io import DEFAULT_SAMPLE_RATE, encode_wav
 
 from ..abc import AbstractAligner, AlignedWord
-from .client import Q3FAClient
+from .client import Q3FAClient, Q3FAResponse
 
 
 class Qwen3ForcedAligner(AbstractAligner):
@@ -21,30 +20,25 @@ class Qwen3ForcedAligner(AbstractAligner):
         base_url: str = "http://localhost:8000",
         language: str = "Chinese",
         session: requests.Session | None = None,
+        batch_size: int = 16,
     ) -> None:
         self._client = Q3FAClient(base_url=base_url, timeout=None, session=session)
         self._language = language
+        self._batch_size = batch_size
 
-    @override
-    def align(
-        self,
-        audio: NpAudioData | NpAudioSamples,
-        text: str,
-        sample_rate: int = DEFAULT_SAMPLE_RATE,
-    ) -> list[AlignedWord]:
+    @staticmethod
+    def _encode(audio: NpAudioData | NpAudioSamples, sample_rate: int) -> bytearray:
         if audio.ndim == 1:
-            audio = np.expand_dims(audio, axis=0)
+            audio = audio.reshape(1, -1)
         elif audio.ndim == 2:
             pass
         else:
             raise ValueError(f"bad audio ndarray dim: {audio.ndim}, 1 or 2 expected")
 
-        buffer = BytesIO()
-        save_audio(buffer, audio, sample_rate)
-        response = self._client.align_bytes(
-            buffer.getvalue(), text=text, language=self._language
-        )
+        return encode_wav(audio, sample_rate)
 
+    @staticmethod
+    def _to_aligned_words(response: Q3FAResponse) -> list[AlignedWord]:
         result: list[AlignedWord] = []
         for w in response["words"]:
             result.append(
@@ -57,3 +51,40 @@ class Qwen3ForcedAligner(AbstractAligner):
                 )
             )
         return result
+
+    @override
+    def align(
+        self,
+        audio: NpAudioData | NpAudioSamples,
+        text: str,
+        sample_rate: int = DEFAULT_SAMPLE_RATE,
+    ) -> list[AlignedWord]:
+        response = self._client.align_bytes(
+            self._encode(audio, sample_rate), text=text, language=self._language
+        )
+        return self._to_aligned_words(response)
+
+    @override
+    def align_batch(
+        self,
+        audios: Sequence[NpAudioData | NpAudioSamples],
+        texts: Sequence[str],
+        sample_rate: int = DEFAULT_SAMPLE_RATE,
+    ) -> list[list[AlignedWord]]:
+        """按 ``batch_size`` 分组，每组一次请求交给服务端批量前向。"""
+        if len(audios) != len(texts):
+            raise ValueError(
+                f"audios and texts length mismatch: {len(audios)} != {len(texts)}"
+            )
+        result: list[list[AlignedWord]] = []
+        for i in range(0, len(audios), self._batch_size):
+            responses = self._client.align_bytes_batch(
+                [
+                    self._encode(a, sample_rate)
+                    for a in audios[i : i + self._batch_size]
+                ],
+                texts[i : i + self._batch_size],
+                language=self._language,
+            )
+            result.extend(self._to_aligned_words(r) for r in responses)
+        return result
@@ -0,0 +1,109 @@
+"""
+cache.py
+
+人声分离结果的磁盘缓存：同一音频 + 同一分离器配置只跑一次分离模型。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from logging import getLogger
+from pathlib import Path
+
+import numpy as np
+
+from karakara.typ import NpAudioData
+
+logger = getLogger(__name__)
+
+
+class StemCache:
+    """以 ``.npy`` 文件保存分离出的音轨，采样率记在文件名里（``<key>.<sr>.npy``）。
+
+    用法::
+
+        cache = StemCache("tmp/stem_cache")
+        key = cache.key(audio_path, separator.cache_tag)
+        if (cached := cache.load(key)) is not None:
+            vocal, sr = cached
+        else:
+            sr = separator.samplerate
+            vocal = separator.separate(audio_np)[separator.VOCAL_STEM_NAME]
+            cache.save(key, vocal, sr)
+
+    命中缓存时连采样率都不必向分离器查询，分离模型完全不会被加载。
+
+    ``StemCache(None)`` 为禁用状态，:meth:`load` 恒返回 None，:meth:`save` 无操作。
+    """
+
+    def __init__(self, cache_dir: str | Path | None) -> None:
+        if cache_dir is not None:
+            self._dir = Path(cache_dir)
+            self._dir.mkdir(parents=True, exist_ok=True)
+            self._enabled = True
+            logger.info(f"StemCache enabled, dir={self._dir}")
+        else:
+            self._dir = Path(".")  # 占位，不会真正使用
+            self._enabled = False
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    @staticmethod
+    def key(audio: str | Path, tag: str) -> str:
+        """根据音频文件路径、修改时间、大小和分离器标识计算缓存键。
+
+        Args:
+            audio: 音频文件路径
+            tag: 分离器标识，见 :attr:`AbstractStemSeparator.cache_tag`
+
+        Returns:
+            16 位十六进制字符串
+        """
+        path = Path(audio).resolve()
+        stat = path.stat()
+        h = hashlib.blake2b(digest_size=8)
+        h.update(os.fsencode(path))
+        h.update(f"|{stat.st_mtime_ns}|{stat.st_size}|{tag}".encode())
+        return h.hexdigest()
+
+    def _find(self, key: str) -> tuple[Path, int] | None:
+        for path in self._dir.glob(f"{key}.*.npy"):
+            sr = path.name[len(key) + 1 : -len(".npy")]
+            if sr.isdigit():
+                return path, int(sr)
+        return None
+
+    def load(self, key: str) -> tuple[NpAudioData, int] | None:
+        """读取缓存的音轨，未命中或缓存未启用时返回 None。
+
+        返回只读的内存映射数组，页面在被切片读取时才载入内存；
+        下游的处理都不是原地修改，可以直接使用。
+
+        Returns:
+            (音轨, 采样率)，未命中时为 None
+        """
+        if not self._enabled:
+            return None
+        if (found := self._find(key)) is None:
+            return None
+        path, sample_rate = found
+        data: NpAudioData = np.load(path, mmap_mode="r")
+        logger.info(f"stem cache hit: {path}")
+        return data, sample_rate
+
+    def save(self, key: str, data: NpAudioData, sample_rate: int) -> Path | None:
+        """写入缓存，返回文件路径；缓存未启用时返回 None。"""
+        if not self._enabled:
+            return None
+        path = self._dir / f"{key}.{sample_rate}.npy"
+        # 先写临时文件再原子替换，避免中断时留下半截缓存；
+        # 临时文件不以 .npy 结尾，不会被 load 误读
+        tmp = path.with_name(f"{path.name}.tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, data)
+        os.replace(tmp, path)
+        logger.debug(f"stem cached: {path} (shape={data.shape})")
+        return path
@@ -1,99 +1,99 @@
 from __future__ import annotations
 
-from copy import deepcopy
-from logging import getLogger
+from collections.abc import Sequence
+from dataclasses import replace
+from logging import DEBUG, getLogger
 from pathlib import Path
 from typing import Literal
 
 import numpy as np
-from lemony_lrc_parser import Lyrics, LyricWord
+from lemony_lrc_parser import LyricLine, Lyrics, LyricWord
 from numpy.typing import NDArray
 
-from karakara.aligner.abc import AbstractAligner
+from karakara.aligner.abc import AbstractAligner, AlignedWord
+from karakara.cache import StemCache
 from karakara.debug import AudioDumper
-from karakara.preprocess import (
-    AudioPreprocessConfig,
-    compress_dynamic_range,
-    normalize_loudness,
-    suppress_vibrato,
-)
+from karakara.preprocess import AudioPreprocessConfig, preprocess
 from karakara.separator.abc import AbstractStemSeparator
-from karakara.utils.io import load_audio, ms2sample
+from karakara.typ import NpAudioData
+from karakara.utils.io import load_audio
 from karakara.utils.lang import detect_lang
 from karakara.utils.metadata import is_metadataline
 
 logger = getLogger(__name__)
 
 
-def gen_kara(
-    lyrics: Lyrics,
-    audio: str | Path,
-    aligner: AbstractAligner,
-    separator: AbstractStemSeparator,
-    *,
-    target_lang: Literal["en", "ja", "zh"] | None = None,
-    preprocess_config: AudioPreprocessConfig | None = None,
-    dump_dir: str | Path | None = None,
-) -> Lyrics:
-    """根据音频和行级歌词生成词级逐字歌词。
+def _line_ms_bounds(
+    lines: Sequence[LyricLine],
+) -> tuple[NDArray[np.int64], NDArray[np.int64]]:
+    """一次性算出所有行对应音频片段的毫秒边界。
 
-    流水线：加载音频 → 人声分离 → 音频预处理 → 按行对齐 → 替换 LyricWord。
+    起点取行开始时间（缺省为 0）；终点优先取行结束时间，其次取下一行开始时间，
+    最后一行或两者都缺失时为 -1（表示到音频末尾）。
 
     Args:
-        lyrics: 已解析的 Lyrics 对象（行级歌词）
-        audio: 音频文件路径
-        aligner: 对齐器实例
-        separator: 人声分离器实例
-        target_lang: 目标处理语言，None 时处理所有检测到的语言
-        preprocess_config: 音频预处理配置，None 时使用默认值
-        dump_dir: 调试音频导出目录，None 时不导出
+        lines: 歌词行
 
     Returns:
-        词级歌词的 Lyrics 对象（content 中每个 LyricWord 带有 start/end）
+        (起点数组, 终点数组)，与 lines 一一对应
     """
-    lyrics = deepcopy(lyrics)
-    dumper = AudioDumper(dump_dir)
+    n = len(lines)
+    starts_ms = np.fromiter((ln.start or 0 for ln in lines), dtype=np.int64, count=n)
+    # -1 表示缺失
+    line_ends_ms = np.fromiter(
+        (-1 if ln.end is None else ln.end for ln in lines), dtype=np.int64, count=n
+    )
+    next_starts_ms = np.fromiter(
+        (-1 if ln.start is None else ln.start for ln in lines[1:]),
+        dtype=np.int64,
+        count=max(n - 1, 0),
+    )
+    ends_ms = np.full(n, -1, dtype=np.int64)
+    ends_ms[:-1] = np.where(line_ends_ms[:-1] >= 0, line_ends_ms[:-1], next_starts_ms)
+    return starts_ms, ends_ms
 
-    # ---------- 加载 & 分离人声 ----------
-    sample_rate = separator.samplerate
-    audio_np = load_audio(audio, sample_rate=sample_rate)
-    dumper.dump("00_input", audio_np, sample_rate)
-    stems = separator.separate(audio_np)
-    vocal_stem = stems[separator.VOCAL_STEM_NAME]
-    dumper.dump("01_vocal_stem", vocal_stem, sample_rate)
 
-    # ---------- 音频预处理 ----------
-    config = (
-        preprocess_config if preprocess_config is not None else AudioPreprocessConfig()
+def _line_sample_bounds(
+    starts_ms: NDArray[np.int64],
+    ends_ms: NDArray[np.int64],
+    sample_rate: int,
+) -> tuple[list[int], list[int | None]]:
+    """把 :func:`_line_ms_bounds` 的毫秒边界换算为采样点。
+
+    Args:
+        starts_ms: 起点（毫秒）
+        ends_ms: 终点（毫秒），-1 表示到音频末尾
+        sample_rate: 采样率
+
+    Returns:
+        (起点列表, 终点列表)，终点为 None 表示到音频末尾
+    """
+    start_samples = starts_ms * sample_rate // 1000
+    end_samples = np.where(ends_ms >= 0, ends_ms * sample_rate // 1000, -1)
+    return (
+        start_samples.tolist(),
+        [None if e < 0 else e for e in end_samples.tolist()],
     )
-    vocal_np: NDArray[np.float32] = vocal_stem[0]
-
-    if config.normalize:
-        vocal_np = normalize_loudness(vocal_np, config.target_dbfs)
-        dumper.dump("02_normalized", vocal_np, sample_rate)
-
-    if config.suppress_vibrato:
-        vocal_np = suppress_vibrato(
-            vocal_np,
-            sample_rate,
-            threshold_hz=config.vibrato_threshold_hz,
-            smooth_window_ms=config.vibrato_smooth_window_ms,
-        )
-        dumper.dump("03_vibrato_suppressed", vocal_np, sample_rate)
-
-    if config.compress:
-        vocal_np = compress_dynamic_range(
-            vocal_np,
-            sample_rate,
-            threshold_dbfs=config.comp_threshold_dbfs,
-            ratio=config.comp_ratio,
-            attack_ms=config.comp_attack_ms,
-            release_ms=config.comp_release_ms,
-        )
-        dumper.dump("04_compressed", vocal_np, sample_rate)
 
-    # ---------- 逐行对齐 ----------
-    for idx, line in enumerate(lyrics.lines):
+
+def _select_lines(
+    lines: Sequence[LyricLine],
+    target_lang: Literal["en", "ja", "zh"] | None,
+) -> list[tuple[int, str]]:
+    """挑出需要对齐的行。
+
+    只处理内容为单个 LyricWord（即尚未逐字化）的行，
+    跳过语言不符和元数据行。
+
+    Args:
+        lines: 歌词行
+        target_lang: 目标处理语言，None 时不按语言过滤
+
+    Returns:
+        (行号, 行文本) 列表
+    """
+    selected: list[tuple[int, str]] = []
+    for idx, line in enumerate(lines):
         # 语言过滤
         text = ""
         if len(line.content) == 1 and (text := line.content[0].content):
@@ -109,75 +109,235 @@ def gen_kara(
 
         if not text:
             continue
+        selected.append((idx, text))
+    return selected
 
-        # 确定音频片段边界
-        start = ms2sample(line.start or 0, sample_rate)
-        end: int | None = None
-        if idx < len(lyrics.lines) - 1:
-            if line.end is not None:
-                end = ms2sample(line.end, sample_rate)
-            elif (next_line := lyrics.lines[idx + 1]).start is not None:
-                end = ms2sample(next_line.start, sample_rate)
 
-        logger.info(f"aligning line {idx}: sample_point[{start}, {end}] {text!r}")
-        if end is not None and start > end:
-            continue
+def _build_kara_line(
+    line: LyricLine,
+    idx: int,
+    text: str,
+    words: Sequence[AlignedWord],
+) -> LyricLine:
+    """用对齐结果组装逐字歌词行。
 
-        audio_piece = vocal_np[start:end] if end is not None else vocal_np[start:]
-        dumper.dump(f"05_line_{idx}", audio_piece, sample_rate)
-        words = aligner.align(audio_piece, text, sample_rate)
+    Args:
+        line: 原歌词行，不会被修改
+        idx: 行号，仅用于日志
+        text: 行文本
+        words: 对齐结果，时间相对于行起点（毫秒）
 
-        # 组装逐字 LyricWord
-        words_kara: list[LyricWord] = []
-        iidx = 0
-        for word in words:
-            if not (pos := word.position):
-                continue
+    Returns:
+        content 替换为逐字 LyricWord 的新行
+    """
+    # 逐词日志只在 DEBUG 级别下才格式化
+    debug_enabled = logger.isEnabledFor(DEBUG)
+    line_start = line.start or 0
+
+    # 组装逐字 LyricWord
+    words_kara: list[LyricWord] = []
+    iidx = 0
+    for word in words:
+        if not (pos := word.position):
+            continue
+        if (
+            (span := word.span) is not None
+            and span[0] >= iidx
+            and text.startswith(word.word, span[0])
+        ):
+            # 对齐器给出了字符偏移，直接定位
+            next_idx = span[0]
+        else:
+            # 否则从当前位置向后查找，指针只前进不回退
             next_idx = text.find(word.word, iidx)
-            if next_idx == -1:
-                logger.warning(
-                    f"aligned word {word.word!r} not found in text "
-                    f"at pos {iidx}, skipping"
-                )
-                continue
+        if next_idx == -1:
+            logger.warning(
+                f"aligned word {word.word!r} not found in text at pos {iidx}, skipping"
+            )
+            continue
+        if debug_enabled:
             logger.debug(
                 f"got aligned word: {word.word!r}, at time {pos!r}ms "
                 f"at line {idx} [{next_idx}, {next_idx + len(word.word)}]"
             )
-            if next_idx > iidx:
-                # 补上前一个单词和当前单词间的空隙
-                words_kara.append(
-                    LyricWord(
-                        start=words_kara[-1].end if words_kara else None,
-                        end=pos[0] + (line.start or 0),
-                        content=text[iidx:next_idx],
-                    )
-                )
-
+        if next_idx > iidx:
+            # 补上前一个单词和当前单词间的空隙
             words_kara.append(
                 LyricWord(
-                    start=pos[0] + (line.start or 0),
-                    end=pos[1] + (line.start or 0),
-                    content=word.word,
+                    start=words_kara[-1].end if words_kara else None,
+                    end=pos[0] + line_start,
+                    content=text[iidx:next_idx],
                 )
             )
-            iidx = next_idx + len(word.word)
 
-        # 尾部剩余文本（仅在有内容时添加）
-        tail = text[iidx:]
-        if tail:
-            words_kara.append(
-                LyricWord(
-                    start=words_kara[-1].end if words_kara else None,
-                    end=None,
-                    content=tail,
-                )
+        words_kara.append(
+            LyricWord(
+                start=pos[0] + line_start,
+                end=pos[1] + line_start,
+                content=word.word,
+            )
+        )
+        iidx = next_idx + len(word.word)
+
+    # 尾部剩余文本（仅在有内容时添加）
+    tail = text[iidx:]
+    if tail:
+        words_kara.append(
+            LyricWord(
+                start=words_kara[-1].end if words_kara else None,
+                end=None,
+                content=tail,
+            )
+        )
+
+    # 原行对象可能与调用方共享，这里返回新行而不是原地修改
+    line_end = line.end
+    if words_kara and words_kara[-1].end is not None:
+        line_end = words_kara[-1].end
+        words_kara[-1].end = None
+    return replace(line, end=line_end, content=words_kara)
+
+
+def separate_vocals(
+    audios: Sequence[str | Path],
+    separator: AbstractStemSeparator,
+    *,
+    cache_dir: str | Path | None = None,
+) -> list[tuple[NpAudioData, int]]:
+    """批量分离多个音频文件的人声。
+
+    未命中缓存的音频一次性交给 :meth:`AbstractStemSeparator.separate_batch`，
+    支持批量推理的分离器（如 Demucs）可以把它们合成一个 batch，
+    摊薄逐文件推理的 kernel launch 开销。模型实例本身在进程内缓存复用；
+    全部命中缓存时不会加载模型。
+    注意未命中的音频会同时解码驻留在内存中。
+
+    Args:
+        audios: 音频文件路径列表
+        separator: 人声分离器实例
+        cache_dir: 人声分离结果的缓存目录，None 时不缓存
+
+    Returns:
+        与 audios 一一对应的 (人声音轨, 采样率)，音轨 shape (channels, samples)
+    """
+    stem_cache = StemCache(cache_dir)
+    keys = [
+        StemCache.key(audio, separator.cache_tag) if stem_cache.enabled else ""
+        for audio in audios
+    ]
+    vocals: dict[int, tuple[NpAudioData, int]] = {}
+    misses: list[int] = []
+    for i, key in enumerate(keys):
+        if (cached := stem_cache.load(key)) is None:
+            misses.append(i)
+        else:
+            vocals[i] = cached
+
+    if misses:
+        sample_rate = separator.samplerate
+        stems_list = separator.separate_batch(
+            [load_audio(audios[i], sample_rate=sample_rate) for i in misses]
+        )
+        for i, stems in zip(misses, stems_list):
+            vocal = stems[separator.VOCAL_STEM_NAME]
+            stem_cache.save(keys[i], vocal, sample_rate)
+            vocals[i] = (vocal, sample_rate)
+    return [vocals[i] for i in range(len(audios))]
+
+
+def gen_kara(
+    lyrics: Lyrics,
+    audio: str | Path,
+    aligner: AbstractAligner,
+    separator: AbstractStemSeparator,
+    *,
+    target_lang: Literal["en", "ja", "zh"] | None = None,
+    preprocess_config: AudioPreprocessConfig | None = None,
+    dump_dir: str | Path | None = None,
+    cache_dir: str | Path | None = None,
+) -> Lyrics:
+    """根据音频和行级歌词生成词级逐字歌词。
+
+    流水线：加载音频 → 人声分离（可缓存） → 音频预处理 → 按行对齐 → 替换 LyricWord。
+
+    Args:
+        lyrics: 已解析的 Lyrics 对象（行级歌词）
+        audio: 音频文件路径
+        aligner: 对齐器实例
+        separator: 人声分离器实例
+        target_lang: 目标处理语言，None 时处理所有检测到的语言
+        preprocess_config: 音频预处理配置，None 时使用默认值
+        dump_dir: 调试音频导出目录，None 时不导出
+        cache_dir: 人声分离结果的缓存目录，None 时不缓存。
+            命中缓存时跳过音频解码和分离
+
+    Returns:
+        词级歌词的 Lyrics 对象（content 中每个 LyricWord 带有 start/end）。
+        输入对象不会被修改；未对齐的行与输入共享同一 LyricLine 对象。
+    """
+    # 只复制容器；被改写的行在组装完成后整行替换（copy-on-write），
+    # 不再深拷贝整份歌词
+    lyrics = replace(lyrics, lines=list(lyrics.lines), metadata=dict(lyrics.metadata))
+    dumper = AudioDumper(dump_dir)
+
+    # ---------- 收集待对齐的行 ----------
+    # 只依赖歌词文本，放在分离之前：没有可对齐的行时直接跳过整条音频流水线
+    candidates = _select_lines(lyrics.lines, target_lang)
+    if not candidates:
+        logger.info("no line to align, skipping separation")
+        return lyrics
+
+    # 按毫秒边界剔除起点晚于终点的行；歌词时间是整数毫秒、采样率不低于 1kHz，
+    # 与换算成采样点后再比较等价，这样不必先向分离器查询采样率
+    starts_ms, ends_ms = _line_ms_bounds(lyrics.lines)
+    targets: list[tuple[int, str]] = []
+    for idx, text in candidates:
+        if 0 <= ends_ms[idx] < starts_ms[idx]:
+            logger.info(
+                f"skip line {idx}: start {starts_ms[idx]}ms > end {ends_ms[idx]}ms"
             )
+            continue
+        targets.append((idx, text))
+
+    if not targets:
+        logger.info("no line to align, skipping separation")
+        return lyrics
+
+    # ---------- 加载 & 分离人声 ----------
+    # 缓存键只由分离器配置决定，命中时不会加载分离模型
+    stem_cache = StemCache(cache_dir)
+    cache_key = StemCache.key(audio, separator.cache_tag) if stem_cache.enabled else ""
+    if (cached := stem_cache.load(cache_key)) is not None:
+        vocal_stem, sample_rate = cached
+    else:
+        sample_rate = separator.samplerate
+        audio_np = load_audio(audio, sample_rate=sample_rate)
+        dumper.dump("00_input", audio_np, sample_rate)
+        stems = separator.separate(audio_np)
+        vocal_stem = stems[separator.VOCAL_STEM_NAME]
+        stem_cache.save(cache_key, vocal_stem, sample_rate)
+    dumper.dump("01_vocal_stem", vocal_stem, sample_rate)
+
+    # 确定音频片段边界
+    start_samples, end_samples = _line_sample_bounds(starts_ms, ends_ms, sample_rate)
+    segments: list[tuple[int, int | None, str]] = []
+    for idx, text in targets:
+        start = start_samples[idx]
+        end = end_samples[idx]
+        logger.info(f"aligning line {idx}: sample_point[{start}, {end}] {text!r}")
+        segments.append((start, end, text))
+
+    # ---------- 音频预处理 ----------
+    vocal_np: NDArray[np.float32] = preprocess(
+        vocal_stem[0], sample_rate, preprocess_config, dumper=dumper
+    )
+    for (idx, _), (start, end, _) in zip(targets, segments):
+        dumper.dump(f"05_line_{idx}", vocal_np[start:end], sample_rate)
+
+    # ---------- 批量对齐 ----------
+    aligned = aligner.align_many(vocal_np, segments, sample_rate)
 
-        # 因为先前是 model_copy(deep=True), 所以这里直接修改没有问题
-        if words_kara and words_kara[-1].end is not None:
-            line.end = words_kara[-1].end
-            words_kara[-1].end = None
-        line.content = words_kara
+    for (idx, text), words in zip(targets, aligned):
+        lyrics.lines[idx] = _build_kara_line(lyrics.lines[idx], idx, text, words)
 
     return lyrics
@@ -7,12 +7,16 @@ preprocess.py
 from __future__ import annotations
 
 from dataclasses import dataclass
+from typing import TYPE_CHECKING
 
 import numpy as np
 from numpy.typing import NDArray
 
 from karakara.typ import NpAudioData, NpAudioSamples
 
+if TYPE_CHECKING:
+    from karakara.debug import AudioDumper
+
 # --------------------------------------------------------------------------
 # 预处理配置
 # --------------------------------------------------------------------------
@@ -259,6 +263,8 @@ def preprocess(
     audio: NpAudioData | NpAudioSamples,
     sample_rate: int,
     config: AudioPreprocessConfig | None = None,
+    *,
+    dumper: AudioDumper | None = None,
 ) -> NpAudioData | NpAudioSamples:
     """对音频应用预处理（归一化 → 颤音抑制 → DRC）。
 
@@ -266,6 +272,7 @@ def preprocess(
         audio: 输入音频
         sample_rate: 采样率 (Hz)
         config: 预处理配置，None 时使用默认值
+        dumper: 可选的调试导出器，每个启用的阶段结束后导出一次中间结果
 
     Returns:
         预处理后的音频，形状不变。
@@ -277,6 +284,8 @@ def preprocess(
 
     if config.normalize:
         result = normalize_loudness(result, config.target_dbfs)
+        if dumper is not None:
+            dumper.dump("02_normalized", result, sample_rate)
 
     if config.suppress_vibrato:
         result = suppress_vibrato(
@@ -285,6 +294,8 @@ def preprocess(
             threshold_hz=config.vibrato_threshold_hz,
             smooth_window_ms=config.vibrato_smooth_window_ms,
         )
+        if dumper is not None:
+            dumper.dump("03_vibrato_suppressed", result, sample_rate)
 
     if config.compress:
         result = compress_dynamic_range(
@@ -295,5 +306,7 @@ def preprocess(
             attack_ms=config.comp_attack_ms,
             release_ms=config.comp_release_ms,
         )
+        if dumper is not None:
+            dumper.dump("04_compressed", result, sample_rate)
 
     return result
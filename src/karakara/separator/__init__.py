@@ -1,4 +1,19 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
 from .abc import AbstractStemSeparator
-from .demucs import DemucsSeparator
+
+if TYPE_CHECKING:
+    from .demucs import DemucsSeparator
 
 __all__ = ["AbstractStemSeparator", "DemucsSeparator"]
+
+
+def __getattr__(name: str) -> Any:
+    # DemucsSeparator 依赖 torch，按需导入；只用到抽象基类（如 core）时不加载 torch
+    if name == "DemucsSeparator":
+        from .demucs import DemucsSeparator
+
+        return DemucsSeparator
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
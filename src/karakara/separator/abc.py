@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
+from collections.abc import Sequence
 from typing import ClassVar
 
 from karakara.typ import NpAudioData, NpAudioSamples
@@ -13,8 +14,28 @@ class AbstractStemSeparator(ABC):
     def separate(self, audio: NpAudioData | NpAudioSamples) -> dict[str, NpAudioData]:
         raise NotImplementedError
 
+    def separate_batch(
+        self, audios: Sequence[NpAudioData | NpAudioSamples]
+    ) -> list[dict[str, NpAudioData]]:
+        """批量分离多段音频，返回结果与输入一一对应。
+
+        默认实现逐段调用 :meth:`separate`；能把多段合并成一次推理的实现应覆盖此方法。
+        """
+        return [self.separate(audio) for audio in audios]
+
     @property
     @abstractmethod
     def samplerate(self) -> int:
         """返回分离器期望的采样率。"""
         return 44100
+
+    @property
+    def cache_tag(self) -> str:
+        """标识分离结果的字符串，用作磁盘缓存键的一部分。
+
+        同一输入在 tag 相同时应得到相同的分离结果；
+        子类的模型或参数会影响输出时应覆盖此属性。
+        tag 只应由配置拼出，不能触发模型加载（缓存命中时分离器不会被用到）；
+        采样率随音轨一起缓存，无须计入。
+        """
+        return type(self).__qualname__
@@ -1,15 +1,13 @@
 from __future__ import annotations
 
 import warnings
-from collections.abc import Callable
-from functools import lru_cache
+from collections.abc import Sequence
+from contextlib import AbstractContextManager, nullcontext
+from functools import cache, lru_cache
 from logging import getLogger
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
-import demucs.api
-import demucs.repo
-import demucs.states
 import torch
 from typing_extensions import override
 
@@ -18,35 +16,47 @@ from karakara.utils.io import ndarray2tensor, tensor2ndarray
 
 from ..abc import AbstractStemSeparator
 
+if TYPE_CHECKING:
+    import demucs.api
+
 DEFAULT_REPO = Path("models/sep/Demucs_Models/v3_v4_repo")
 DEFAULT_MODEL = "htdemucs_6s"
 DEFAULT_DEVICE = "cuda:0"
 
 logger = getLogger(__name__)
 
-# ── PyTorch 2.6+ 兼容性修复 ────────────────────────────────────
-# demucs 的 checkpoint 使用 pickle 序列化了完整的模型类对象，
-# 而 PyTorch 2.6+ 默认 weights_only=True 会拒绝反序列化。
-# 这里精确地 patch demucs 的 load_model，不影响其他代码的 torch.load。
-_original_load_model: Callable[..., Any] = demucs.states.load_model
-
-
-def _patched_load_model(
-    path_or_package: dict[str, Any] | str | Path,
-    strict: bool = False,
-) -> Any:
-    if isinstance(path_or_package, (str, Path)):
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore")
-            path_or_package = torch.load(
-                path_or_package, map_location="cpu", weights_only=False
-            )
-    return _original_load_model(path_or_package, strict)
 
+@cache
+def _import_demucs() -> None:
+    """首次真正需要时才导入 demucs 并打补丁。
+
+    demucs 的导入链很重，只 import 本模块（例如只用到类型或对齐器）时不应付出这份开销。
+    """
+    import demucs.api
+    import demucs.repo
+    import demucs.states
+
+    # ── PyTorch 2.6+ 兼容性修复 ────────────────────────────────────
+    # demucs 的 checkpoint 使用 pickle 序列化了完整的模型类对象，
+    # 而 PyTorch 2.6+ 默认 weights_only=True 会拒绝反序列化。
+    # 这里精确地 patch demucs 的 load_model，不影响其他代码的 torch.load。
+    original_load_model = demucs.states.load_model
 
-demucs.states.load_model = _patched_load_model
-demucs.repo.load_model = _patched_load_model  # repo.py 持有独立引用
-# ── 修复结束 ──────────────────────────────────────────────────
+    def _patched_load_model(
+        path_or_package: dict[str, Any] | str | Path,
+        strict: bool = False,
+    ) -> Any:
+        if isinstance(path_or_package, (str, Path)):
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                path_or_package = torch.load(
+                    path_or_package, map_location="cpu", weights_only=False
+                )
+        return original_load_model(path_or_package, strict)
+
+    demucs.states.load_model = _patched_load_model
+    demucs.repo.load_model = _patched_load_model  # repo.py 持有独立引用
+    # ── 修复结束 ──────────────────────────────────────────────────
 
 
 @lru_cache(maxsize=4)
@@ -54,8 +64,15 @@ def _get_demucs_separator(
     model: str,
     repo: str,
     device: str,
+    compile_model: bool = False,
+    segment: float | None = None,
+    overlap: float = 0.25,
+    channels_last: bool = False,
 ) -> demucs.api.Separator:
     """获取（可能已缓存的）Demucs Separator 实例。"""
+    _import_demucs()
+    import demucs.api
+
     models = demucs.api.list_models(Path(repo))
     assert model in models["single"] or model in models["bag"], (
         f"model {model!r} not found in repo {repo!r}"
@@ -64,11 +81,45 @@ def _get_demucs_separator(
         model=model,
         repo=Path(repo),
         device=device,
+        segment=segment,
+        overlap=overlap,
     )
+    # 预训练模型加载后本就处于 eval 模式，这里显式确认，避免 dropout 等训练分支
+    sep.model.eval()
+    if torch.device(device).type == "cuda":
+        # demucs 按固定长度分段推理，卷积输入形状恒定，
+        # 让 cuDNN 首次为每种形状挑选最快的算法，之后直接复用
+        torch.backends.cudnn.benchmark = True
+    if channels_last:
+        # 只有 4D 参数（频谱分支的 Conv2d 权重）会被转换，时域分支的 1D 卷积不受影响
+        sep.model.to(memory_format=torch.channels_last)
     logger.debug(f"Demucs Separator created: model={model!r}, device={device!r}")
+    if compile_model:
+        _compile_separator_model(sep)
     return sep
 
 
+def _compile_separator_model(sep: demucs.api.Separator) -> None:
+    """用 ``torch.compile(mode="reduce-overhead")`` 编译分离模型。
+
+    demucs 按固定长度分段推理（末段会补齐），输入形状恒定，
+    reduce-overhead 模式可以借 CUDA Graphs 消掉逐算子的 launch 开销。
+    BagOfModels 本身不可调用，``apply_model`` 会逐个调用其子模型，
+    所以编译的是子模型而不是整个 bag。
+
+    只原地替换各模型的 ``forward``，不用 ``torch.compile(module)`` 返回的
+    OptimizedModule 包装：``apply_model`` 按 ``isinstance(model, HTDemucs)``
+    决定分段的补齐方式，包装后判断失效，指定 segment 时输出会改变。
+    """
+    from demucs.apply import BagOfModels
+
+    model = sep.model
+    models = model.models if isinstance(model, BagOfModels) else [model]
+    for m in models:
+        m.forward = torch.compile(m.forward, mode="reduce-overhead")
+    logger.debug("Demucs model compiled with torch.compile")
+
+
 class DemucsSeparator(AbstractStemSeparator):
     """基于 Meta Demucs 的音轨分离器。"""
 
@@ -79,23 +130,131 @@ class DemucsSeparator(AbstractStemSeparator):
         model: str = DEFAULT_MODEL,
         repo: Path = DEFAULT_REPO,
         device: str = DEFAULT_DEVICE,
+        half: bool = False,
+        compile_model: bool = False,
+        half_dtype: torch.dtype = torch.float16,
+        segment: float | None = None,
+        overlap: float = 0.25,
+        channels_last: bool = False,
     ) -> None:
+        """
+        Args:
+            model: 模型名
+            repo: 本地模型仓库目录
+            device: 推理设备
+            half: 在 CUDA 上以半精度 autocast 推理（权重仍为 fp32），
+                  可利用 Tensor Core 并减少激活显存；CPU 上忽略
+            compile_model: 首次加载模型时用 torch.compile 编译，
+                  首次分离会多出编译耗时，之后的分离更快
+            half_dtype: half 启用时 autocast 使用的类型，torch.float16 或
+                  torch.bfloat16；bf16 数值范围与 fp32 相同，不易溢出，需要 Ampere 及以上
+            segment: 分段推理的每段时长（秒），None 时使用模型默认值；
+                  显存占用只与段长有关，显存较小时可以调小
+            overlap: 相邻分段的重叠比例，重叠部分加权平均拼接
+            channels_last: 把模型的 Conv2d 权重转为 channels_last 布局，
+                  Ampere 及以上的 GPU 配合半精度时 cuDNN 可选用更快的 Tensor Core 内核
+        """
+        if half_dtype not in (torch.float16, torch.bfloat16):
+            raise ValueError(
+                f"half_dtype must be torch.float16 or torch.bfloat16, got {half_dtype}"
+            )
         self._model = model
         self._repo = repo
         self._device = device
+        self._half = half
+        self._compile_model = compile_model
+        self._half_dtype = half_dtype
+        self._segment = segment
+        self._overlap = overlap
+        self._channels_last = channels_last
 
     @property
     def samplerate(self) -> int:
         return self._separator.samplerate  # type: ignore[no-any-return]
 
+    @property
+    @override
+    def cache_tag(self) -> str:
+        # compile / channels_last 只影响速度不影响结果，不计入缓存键
+        if not self._half:
+            precision = "fp32"
+        else:
+            precision = "bf16" if self._half_dtype == torch.bfloat16 else "fp16"
+        # 只用构造参数拼出，读取时不会加载模型
+        return (
+            f"demucs:{self._model}@{self._repo}:{precision}"
+            f":seg={self._segment}:ov={self._overlap}"
+        )
+
     @property
     def _separator(self) -> demucs.api.Separator:
         return _get_demucs_separator(
             model=self._model,
             repo=str(self._repo),
             device=self._device,
+            compile_model=self._compile_model,
+            segment=self._segment,
+            overlap=self._overlap,
+            channels_last=self._channels_last,
         )
 
+    def _autocast(self) -> AbstractContextManager[Any]:
+        if self._half and torch.device(self._device).type == "cuda":
+            return torch.autocast(device_type="cuda", dtype=self._half_dtype)
+        return nullcontext()
+
+    def warmup(self) -> None:
+        """加载模型并用一段静音跑一次推理。
+
+        启用 compile_model 时编译发生在首次前向，CUDA 上还有 cuDNN 选算法等一次性开销；
+        在服务启动时调用本方法，可以把这些开销挪出第一个真实请求。
+        warm-up 与正式推理使用相同的 autocast 设置，编译出的图可以直接复用。
+        """
+        from demucs.apply import BagOfModels
+
+        sep = self._separator
+        model = sep.model
+        if isinstance(model, BagOfModels):
+            # bag 本身没有 segment，apply_model 按子模型的 segment 分段
+            model = model.models[0]
+        length = int(float(sep._segment or model.segment) * sep.samplerate)
+        self.separate_tensor(torch.zeros(sep.audio_channels, length))
+        logger.debug(f"Demucs warm-up done, {length} samples")
+
+    def separate_tensor(self, audio: torch.Tensor) -> dict[str, torch.Tensor]:
+        """分离音轨，结果留在推理设备上。
+
+        适合下游继续在 GPU 上处理的场景，省去 GPU → 主机的拷贝。
+        整段输入和各音轨结果都驻留显存，显存占用随音频长度增长；
+        长音频显存不足时改用 :meth:`separate`。
+
+        Args:
+            audio: 输入音频 tensor，shape (channels, samples) 或 (samples,)。
+                   不在推理设备上时会先整段拷贝过去。
+
+        Returns:
+            stem_name → tensor (channels, samples) 的字典，位于推理设备上；
+            启用 half 时 dtype 可能是 half_dtype。
+            推理在 inference_mode 下进行，返回的是 inference tensor，不能参与 autograd
+        """
+        # 不先 pin_memory()：临时锁页本身就是一次整段主机拷贝，
+        # 而紧接着的推理在同一个流上，异步传输也无从重叠
+        return self._separate(audio.to(self._device))
+
+    def _separate(self, audio: torch.Tensor) -> dict[str, torch.Tensor]:
+        """在 audio 所在设备上分离，结果也留在该设备上。
+
+        audio 在 CPU 上时，apply_model 每次只把当前分段搬到推理设备，
+        各段结果搬回 CPU 后重叠相加，显存占用与音频长度无关。
+        """
+        if audio.dim() == 1:
+            audio = audio.unsqueeze(0)
+        sr = self.samplerate
+        logger.info(f"separating with Demucs, sr={sr}")
+        with torch.inference_mode(), self._autocast():
+            _, stems = self._separator.separate_tensor(audio, sr=sr)
+        return stems  # type: ignore[no-any-return]
+
     @override
     def separate(self, audio: NpAudioData | NpAudioSamples) -> dict[str, NpAudioData]:
         """分离音轨。
@@ -107,18 +266,75 @@ class DemucsSeparator(AbstractStemSeparator):
         Returns:
             stem_name → NpAudioData 的字典，如 {"vocals": ..., "drums": ..., ...}
         """
-        import numpy as np
-
-        if audio.ndim == 1:
-            audio = np.expand_dims(audio, axis=0)
-
-        tensor = ndarray2tensor(audio)
-        sr = self.samplerate
-        logger.info(f"separating with Demucs, sr={sr}")
-        _, stems = self._separator.separate_tensor(tensor, sr=sr)
+        # 输入留在主机内存，显存里只有当前分段，长音频也不会 OOM
+        stems = self._separate(ndarray2tensor(audio))
 
         result: dict[str, NpAudioData] = {}
         for name, stem_tensor in stems.items():
             result[name] = tensor2ndarray(stem_tensor)
         logger.info(f"separation done, stems: {list(result.keys())}")
         return result
+
+    @override
+    def separate_batch(
+        self, audios: Sequence[NpAudioData | NpAudioSamples]
+    ) -> list[dict[str, NpAudioData]]:
+        """把多段音频补齐到同一长度后合并成一个 batch 推理。
+
+        各段按自身的均值 / 标准差归一化后再补零，输出截回原长度。
+        整个 batch 留在主机内存上，apply_model 只把当前分段搬到推理设备，
+        显存占用与单段推理相当。
+        末段附近的分段可能包含补零部分，结果与逐段分离会有极小差异。
+
+        Args:
+            audios: 输入音频列表，每段 shape (channels, samples) 或 (samples,)，
+                    声道数须一致
+
+        Returns:
+            每段音频的 stem_name → NpAudioData 字典
+        """
+        if not audios:
+            return []
+        tensors = [ndarray2tensor(a).reshape(-1, a.shape[-1]) for a in audios]
+        if len({t.shape[0] for t in tensors}) != 1:
+            raise ValueError("all audios in a batch must have the same channel count")
+        lengths = [t.shape[1] for t in tensors]
+
+        batch = torch.zeros(
+            (len(tensors), tensors[0].shape[0], max(lengths)), dtype=torch.float32
+        )
+        norms: list[tuple[torch.Tensor, torch.Tensor]] = []
+        for i, t in enumerate(tensors):
+            # 与 demucs.api.Separator.separate_tensor 相同的归一化
+            ref = t.mean(0)
+            mean, std = ref.mean(), ref.std() + 1e-8
+            batch[i, :, : lengths[i]] = (t - mean) / std
+            norms.append((mean, std))
+
+        from demucs.apply import apply_model
+
+        sep = self._separator
+        logger.info(f"separating {len(tensors)} tracks with Demucs in one batch")
+        with torch.inference_mode(), self._autocast():
+            out = apply_model(
+                sep.model,
+                batch,
+                segment=sep._segment,
+                shifts=sep._shifts,
+                split=sep._split,
+                overlap=sep._overlap,
+                device=sep._device,
+                num_workers=sep._jobs,
+            )
+
+        results: list[dict[str, NpAudioData]] = []
+        for i, (mean, std) in enumerate(norms):
+            stems = out[i, ..., : lengths[i]].float() * std + mean
+            results.append(
+                {
+                    name: tensor2ndarray(stem)
+                    for name, stem in zip(sep.model.sources, stems)
+                }
+            )
+        logger.info(f"batch separation done, stems: {list(sep.model.sources)}")
+        return results
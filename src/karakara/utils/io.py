@@ -1,17 +1,82 @@
 from __future__ import annotations
 
+import struct
 import warnings
 from io import BytesIO
 from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
 import av
 import numpy as np
-import torch
 from numpy.typing import NDArray
 
 from karakara.typ import NpAudioData
 
+if TYPE_CHECKING:
+    import torch
+
 DEFAULT_SAMPLE_RATE = 44100
+# 写 file-like 目标时 PyAV 的 IO 缓冲区大小；默认 32 KiB 对整首歌的 WAV 来说
+# 意味着上千次 Python 层 write 回调
+WRITE_BUFFER_SIZE = 1 << 20
+# save_audio 每次量化 + 编码的采样点数
+ENCODE_CHUNK_SAMPLES = 65536
+
+
+def _estimate_samples(
+    container: av.container.InputContainer,
+    stream: av.AudioStream,
+    sample_rate: int,
+) -> int:
+    """根据流/容器时长估算重采样后的采样点数，无法估算时返回 0。"""
+    if stream.duration is not None and stream.time_base is not None:
+        seconds = float(stream.duration * stream.time_base)
+    elif container.duration is not None:
+        seconds = container.duration / av.time_base
+    else:
+        return 0
+    # 略微多分配一点，时长元数据通常不是精确值
+    return int(seconds * sample_rate * 1.01) + 4096
+
+
+class _SampleBuffer:
+    """按帧追加采样的预分配缓冲区，容量不足时倍增扩容。"""
+
+    def __init__(self, capacity: int) -> None:
+        self._capacity = capacity
+        self._buf: NDArray[np.float32] | None = None
+        self._cursor = 0
+
+    def _reserve(self, channels: int, n: int) -> NDArray[np.float32]:
+        if self._buf is None:
+            self._buf = np.empty((channels, max(self._capacity, n)), dtype=np.float32)
+        elif self._cursor + n > self._buf.shape[1]:
+            grown = np.empty(
+                (channels, max(self._buf.shape[1] * 2, self._cursor + n)),
+                dtype=np.float32,
+            )
+            grown[:, : self._cursor] = self._buf[:, : self._cursor]
+            self._buf = grown
+        return self._buf[:, self._cursor : self._cursor + n]
+
+    def append(self, frame: av.AudioFrame) -> None:
+        """追加一帧 fltp 格式的采样。
+
+        每个 plane 是一个声道的连续 float32 采样，直接经缓冲区协议读出写入目标切片，
+        不经过 ``to_ndarray`` 为每帧分配的临时数组。
+        plane 的缓冲区按对齐要求可能带填充，只取前 ``frame.samples`` 个采样。
+        """
+        n = frame.samples
+        planes = frame.planes
+        dst = self._reserve(len(planes), n)
+        for ch, plane in enumerate(planes):
+            np.copyto(dst[ch], np.frombuffer(plane, dtype=np.float32, count=n))
+        self._cursor += n
+
+    def result(self) -> NDArray[np.float32] | None:
+        if self._buf is None:
+            return None
+        return self._buf[:, : self._cursor]
 
 
 def load_audio(
@@ -26,10 +91,12 @@ def load_audio(
     axis: (channels, samples)
     """
     resampler = av.AudioResampler("fltp", rate=sample_rate)
-    frames_np: list[np.ndarray] = []
 
     with av.open(src, "r") as container:
         audio_stream = container.streams.audio[audiotrack_idx]
+        # 按时长预分配一整块缓冲区，解码出的帧直接写入对应切片，
+        # 避免逐帧 ndarray 列表 + concatenate + astype 的多次整段拷贝
+        buffer = _SampleBuffer(_estimate_samples(container, audio_stream, sample_rate))
 
         # 手动 demux + decode 以捕获单帧错误
         for packet in container.demux(audio_stream):
@@ -39,7 +106,7 @@ def load_audio(
                         f"Expected AudioFrame from audio stream, got {type(raw_frame).__name__}"
                     )
                     for frame in resampler.resample(raw_frame):
-                        frames_np.append(frame.to_ndarray())
+                        buffer.append(frame)
             except av.InvalidDataError as e:
                 if skip_invalid:
                     warnings.warn(f"跳过损坏的音频帧 @ {packet.pts}: {e}")
@@ -53,23 +120,42 @@ def load_audio(
 
         # 最后 flush resampler
         for frame in resampler.resample(None):
-            frames_np.append(frame.to_ndarray())
-    if not frames_np:
-        raise ValueError("未能读取任何有效音频帧，文件可能已严重损坏")
+            buffer.append(frame)
 
-    wf_np: NDArray[np.float32] = np.concatenate(frames_np, axis=1).astype(np.float32)
+    wf_np = buffer.result()
+    if wf_np is None:
+        raise ValueError("未能读取任何有效音频帧，文件可能已严重损坏")
     return wf_np
 
 
+def _to_pcm16(
+    data: NpAudioData,
+    out: NDArray[np.int16] | None = None,
+    scratch: NDArray[np.float32] | None = None,
+) -> NDArray[np.int16]:
+    """float 采样 → int16 PCM。
+
+    裁剪、缩放和取整都在同一块 float32 缓冲区上原地完成，
+    乘数用 np.float32 以免中间结果被提升为 float64。
+    先四舍五入再转换，避免直接截断带来的向零偏置。
+    传入 ``out`` / ``scratch`` 时复用调用方的缓冲区，不再分配。
+    """
+    # 防止溢出：先裁剪到 [-1.0, 1.0] 范围
+    scaled = np.clip(data, -1.0, 1.0, out=scratch, dtype=np.float32)
+    np.multiply(scaled, np.float32(32767.0), out=scaled)
+    np.rint(scaled, out=scaled)
+    if out is None:
+        return scaled.astype(np.int16)
+    np.copyto(out, scaled, casting="unsafe")
+    return out
+
+
 def save_audio(
     dst: str | Path | BytesIO,
     data: NpAudioData,
     sample_rate: int = DEFAULT_SAMPLE_RATE,
 ) -> None:
-    # 防止溢出：先裁剪到 [-1.0, 1.0] 范围
-    data_clipped = np.clip(data, -1.0, 1.0)
-    data_np_i16 = (data_clipped * 32767).astype(np.int16)
-    channel_n = data_np_i16.shape[0]
+    channel_n = data.shape[0]
     if channel_n == 1:
         layout = "mono"
     elif channel_n == 2:
@@ -77,36 +163,150 @@ def save_audio(
     else:
         raise ValueError(f"save_audio 仅支持 1 或 2 声道, 收到 {channel_n} 声道")
 
-    with av.open(dst, "w", format="wav") as container:
+    # 分块量化 + 编码，两块小缓冲区反复复用，
+    # 不再为整段音频分配 float32 中间结果和 int16 副本
+    n = data.shape[1]
+    chunk = max(1, min(n, ENCODE_CHUNK_SAMPLES))
+    scratch = np.empty((channel_n, chunk), dtype=np.float32)
+    pcm = np.empty((channel_n, chunk), dtype=np.int16)
+
+    with av.open(dst, "w", format="wav", buffer_size=WRITE_BUFFER_SIZE) as container:
         stream = container.add_stream(
             "pcm_s16le",
             rate=sample_rate,
             layout=layout,
         )
 
-        frame = av.AudioFrame.from_ndarray(data_np_i16, format="s16p", layout=layout)
-        frame.sample_rate = sample_rate
-
         # 编码并写入文件
-        for packet in stream.encode(frame):
-            container.mux(packet)
+        for start in range(0, n, chunk):
+            m = min(chunk, n - start)
+            pcm_chunk = _to_pcm16(
+                data[:, start : start + m], out=pcm[:, :m], scratch=scratch[:, :m]
+            )
+            frame = av.AudioFrame.from_ndarray(pcm_chunk, format="s16p", layout=layout)
+            frame.sample_rate = sample_rate
+            frame.pts = start
+            for packet in stream.encode(frame):
+                container.mux(packet)
 
         # Flush a-v stream
         for packet in stream.encode(None):
             container.mux(packet)
 
 
+def encode_wav(
+    data: NpAudioData,
+    sample_rate: int = DEFAULT_SAMPLE_RATE,
+) -> bytearray:
+    """把音频编码为内存中的 16-bit PCM WAV。
+
+    直接写 44 字节 RIFF 头，量化结果就地交错写入同一块输出缓冲区，
+    不经过 PyAV 的 muxer / encoder 初始化，适合逐行对齐时频繁编码短片段。
+
+    Args:
+        data: 音频数据，shape (channels, samples)
+        sample_rate: 采样率
+
+    Returns:
+        完整的 WAV 文件内容。
+    """
+    channel_n, n = data.shape
+    size = n * channel_n * 2
+    buf = bytearray(44 + size)
+    struct.pack_into(
+        "<4sI4s4sIHHIIHH4sI",
+        buf,
+        0,
+        b"RIFF",
+        36 + size,
+        b"WAVE",
+        b"fmt ",
+        16,  # fmt chunk 大小
+        1,  # PCM
+        channel_n,
+        sample_rate,
+        sample_rate * channel_n * 2,  # byte rate
+        channel_n * 2,  # block align
+        16,  # bits per sample
+        b"data",
+        size,
+    )
+    # (samples, channels) 的交错视图，转置后按 (channels, samples) 写入
+    pcm: NDArray[np.int16] = np.frombuffer(buf, dtype="<i2", offset=44).reshape(
+        n, channel_n
+    )
+    _to_pcm16(data, out=pcm.T)
+    return buf
+
+
+def encode_flac(
+    data: NpAudioData,
+    sample_rate: int = DEFAULT_SAMPLE_RATE,
+) -> bytes:
+    """把音频编码为内存中的 16-bit FLAC。
+
+    无损压缩，体积通常只有同等 WAV 的一半左右，适合需要经网络上传的场景。
+    量化与 :func:`encode_wav` 共用 :func:`_to_pcm16`（裁剪 + 四舍五入），
+    两种格式承载的 PCM 完全一致；libsndfile 写 float 时不会裁剪越界采样。
+
+    Args:
+        data: 音频数据，shape (channels, samples)
+        sample_rate: 采样率
+
+    Returns:
+        完整的 FLAC 文件内容。
+    """
+    import soundfile
+
+    pcm = _to_pcm16(data)
+    buffer = BytesIO()
+    soundfile.write(buffer, pcm.T, sample_rate, format="FLAC", subtype="PCM_16")
+    return buffer.getvalue()
+
+
 def ndarray2tensor(array: NDArray[np.float32]) -> torch.Tensor:
+    # torch 只在真正转换时导入，只用到音频读写的调用方不必加载 torch
+    import torch
+
     return torch.from_numpy(array)
 
 
-def tensor2ndarray(tensor: torch.Tensor) -> NDArray[np.float32]:
-    return tensor.cpu().contiguous().numpy()  # type: ignore[return-value]
+def tensor2ndarray(
+    tensor: torch.Tensor, dtype: torch.dtype | None = None
+) -> NDArray[Any]:
+    """tensor → ndarray，类型转换与拷回主机合并为一次拷贝。
+
+    Args:
+        tensor: 任意设备上的 tensor
+        dtype: 结果类型，须为 numpy 支持的类型；None 时为 torch.float32。
+               半精度推理（fp16 / bf16）的结果默认统一转成 float32，numpy 不支持 bf16
+
+    Returns:
+        连续的 ndarray
+    """
+    import torch
+
+    if dtype is None:
+        dtype = torch.float32
+    # detach：带梯度的 tensor 不能直接 .numpy()
+    # 一次 to() 完成类型转换、连续化和拷回；
+    # CPU 上已是目标类型的连续 tensor 不会发生拷贝。
+    # 不用锁页内存中转：拷完立即同步，异步拷贝没有可重叠的工作，
+    # 而返回的 ndarray 会让锁页内存在整个音轨的生命周期内都无法释放
+    return (
+        tensor.detach()
+        .to("cpu", dtype=dtype, memory_format=torch.contiguous_format)
+        .numpy()
+    )
 
 
 def ms2sample(ms: int | float, sample_rate: int = DEFAULT_SAMPLE_RATE) -> int:
-    return int(ms * sample_rate / 1000)
+    # 整数运算：结果精确且单调，大时间戳也不会有浮点误差
+    if isinstance(ms, float):
+        return int(ms * sample_rate / 1000)
+    return ms * sample_rate // 1000
 
 
 def sample2ms(sample: int, sample_rate: int = DEFAULT_SAMPLE_RATE) -> int:
-    return int(sample / sample_rate * 1000)
+    # 浮点输入时 // 的结果仍是 float，统一转回 int
+    return int(sample * 1000 // sample_rate)
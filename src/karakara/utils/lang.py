@@ -1,9 +1,12 @@
 from __future__ import annotations
 
-import re
+from functools import lru_cache
 from logging import getLogger
 from typing import Literal
 
+import numpy as np
+from numpy.typing import NDArray
+
 logger = getLogger(__name__)
 
 # --------------------------------------------------------------------------
@@ -12,11 +15,28 @@ logger = getLogger(__name__)
 
 # 日语检测：仅匹配假名（平假名 + 片假名），不包含 CJK 汉字以避免与中文重叠
 # 但是这也意味着包含汉字的日语歌词可能被误判为中文, 这里还需要改
-_JA_PATTERN = re.compile(r"[\u3040-\u309F\u30A0-\u30FF]")
-_ZH_PATTERN = re.compile(r"[\u4E00-\u9FFF]")
-_EN_PATTERN = re.compile(r"[A-Za-z]")
+_JA_RANGE = (0x3040, 0x30FF)
+_ZH_RANGE = (0x4E00, 0x9FFF)
+# 不短于此长度的字符串改用 NumPy 向量化计数，更短时数组化的开销不划算
+_VECTORIZE_MIN_LEN = 64
+
+
+def _count_in_range(cps: NDArray[np.uint32], lo: int, hi: int) -> int:
+    return int(np.count_nonzero((cps >= lo) & (cps <= hi)))
+
+
+def _count_vectorized(s: str) -> tuple[int, int, int]:
+    """把字符串转成码位数组后按区间计数，返回 (ja, zh, en)。"""
+    cps = np.frombuffer(s.encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+    return (
+        _count_in_range(cps, *_JA_RANGE),
+        _count_in_range(cps, *_ZH_RANGE),
+        _count_in_range(cps, 0x41, 0x5A) + _count_in_range(cps, 0x61, 0x7A),
+    )
 
 
+# 歌词里重复的行（副歌等）很多，缓存判定结果；命中缓存时不会再输出日志
+@lru_cache(maxsize=4096)
 def detect_lang(s: str) -> Literal["ja", "zh", "en"] | None:
     """根据字符串内容判断语言类型。
 
@@ -26,9 +46,23 @@ def detect_lang(s: str) -> Literal["ja", "zh", "en"] | None:
     Returns:
         "ja"（日语）、"zh"（中文）、"en"（英语）或 None（无法判断）。
     """
-    ja_count = len(_JA_PATTERN.findall(s))
-    zh_count = len(_ZH_PATTERN.findall(s))
-    en_count = len(_EN_PATTERN.findall(s))
+    if len(s) >= _VECTORIZE_MIN_LEN:
+        ja_count, zh_count, en_count = _count_vectorized(s)
+    else:
+        # 单次遍历按码位分类计数，不再对整串做三次 findall
+        ja_lo, ja_hi = _JA_RANGE
+        zh_lo, zh_hi = _ZH_RANGE
+        ja_count = zh_count = en_count = 0
+        for c in s:
+            if c.isascii():
+                if c.isalpha():
+                    en_count += 1
+                continue
+            cp = ord(c)
+            if zh_lo <= cp <= zh_hi:
+                zh_count += 1
+            elif ja_lo <= cp <= ja_hi:
+                ja_count += 1
 
     counts: dict[str, int] = {"ja": ja_count, "zh": zh_count, "en": en_count}
     max_lang = max(counts, key=counts.__getitem__)
@@ -7,6 +7,7 @@ metadata.py
 from __future__ import annotations
 
 import re
+from functools import lru_cache
 
 # 常见的元数据行关键词（中文 / 繁体中文 / 日文）
 METADATA_KEYWORDS: list[str] = [
@@ -45,6 +46,7 @@ _METADATA_PATTERN = re.compile(
 )
 
 
+@lru_cache(maxsize=4096)
 def is_metadataline(s: str) -> bool:
     """判断字符串是否为元数据行（如「作词: xxx」「作曲: xxx」）。
 
@@ -54,4 +56,7 @@ def is_metadataline(s: str) -> bool:
     Returns:
         若疑似元数据行则返回 True，否则返回 False。
     """
+    # 元数据行必然带冒号，绝大多数歌词行在这里就能排除，不必跑正则
+    if ":" not in s and "：" not in s:
+        return False
     return bool(_METADATA_PATTERN.search(s))
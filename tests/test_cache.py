@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+import numpy as np
+
+from karakara.cache import StemCache
+
+
+def _audio_file(tmp_path: Path) -> Path:
+    path = tmp_path / "song.mp3"
+    path.write_bytes(b"fake audio")
+    return path
+
+
+def test_key_depends_on_file_and_tag(tmp_path: Path) -> None:
+    audio = _audio_file(tmp_path)
+    key = StemCache.key(audio, "tag-a")
+
+    assert StemCache.key(audio, "tag-a") == key
+    assert len(key) == 16
+    assert StemCache.key(audio, "tag-b") != key
+
+    # 内容或修改时间变化后键随之改变
+    stat = audio.stat()
+    os.utime(audio, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert StemCache.key(audio, "tag-a") != key
+
+
+def test_round_trip(tmp_path: Path) -> None:
+    cache = StemCache(tmp_path / "cache")
+    data = np.random.default_rng(0).standard_normal((2, 1000)).astype(np.float32)
+
+    assert cache.load("abc") is None
+    path = cache.save("abc", data, 44100)
+    assert path is not None and path.name == "abc.44100.npy"
+
+    cached = cache.load("abc")
+    assert cached is not None
+    loaded, sample_rate = cached
+    assert sample_rate == 44100
+    np.testing.assert_array_equal(loaded, data)
+    # 原子替换后不残留临时文件
+    assert [p.name for p in (tmp_path / "cache").iterdir()] == ["abc.44100.npy"]
+
+
+def test_ignores_partial_writes(tmp_path: Path) -> None:
+    cache = StemCache(tmp_path)
+    (tmp_path / "abc.44100.npy.tmp").write_bytes(b"truncated")
+
+    assert cache.load("abc") is None
+
+
+def test_disabled() -> None:
+    cache = StemCache(None)
+
+    assert not cache.enabled
+    assert cache.save("abc", np.zeros((1, 4), dtype=np.float32), 44100) is None
+    assert cache.load("abc") is None
@@ -0,0 +1,332 @@
+from __future__ import annotations
+
+import random
+from copy import deepcopy
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pytest
+from lemony_lrc_parser import LyricLine, Lyrics, LyricWord
+
+from karakara.aligner.abc import AbstractAligner, AlignedWord
+from karakara.core import (
+    _build_kara_line,
+    _line_ms_bounds,
+    _line_sample_bounds,
+    gen_kara,
+    separate_vocals,
+)
+from karakara.preprocess import preprocess
+from karakara.separator.abc import AbstractStemSeparator
+from karakara.utils.io import load_audio, ms2sample, sample2ms, save_audio
+
+SR = 16000
+
+
+class _FakeSeparator(AbstractStemSeparator):
+    """把输入原样当作人声返回，并记录调用次数。"""
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    @property
+    def samplerate(self) -> int:
+        return SR
+
+    @property
+    def cache_tag(self) -> str:
+        return "fake"
+
+    def separate(self, audio: Any) -> dict[str, Any]:
+        self.calls += 1
+        return {self.VOCAL_STEM_NAME: np.asarray(audio, dtype=np.float32)}
+
+
+class _FakeAligner(AbstractAligner):
+    """按空格切词；词的时间由片段长度和词序决定，片段切错时结果随之改变。"""
+
+    def align(self, audio: Any, text: str, sample_rate: int = SR) -> list[AlignedWord]:
+        base = sample2ms(audio.shape[-1], sample_rate) % 50
+        return [
+            AlignedWord(word, (base + i * 100, base + i * 100 + 80))
+            for i, word in enumerate(text.split())
+        ]
+
+
+def _line(start: int | None, end: int | None, text: str) -> LyricLine:
+    return LyricLine(start=start, end=end, content=[LyricWord(content=text)])
+
+
+def _lyrics() -> Lyrics:
+    return Lyrics(
+        lines=[
+            _line(500, None, "hello world"),
+            _line(1200, None, "作词 : someone"),
+            _line(2000, None, ""),
+            _line(3000, 4500, "foo bar baz"),
+            # 起点晚于终点，应被跳过
+            _line(6000, 5500, "skipped line"),
+            _line(6500, None, "春の風が吹く"),
+            _line(8000, None, "last line  "),
+        ],
+        metadata={"ti": "test"},
+    )
+
+
+@pytest.fixture
+def audio_file(tmp_path: Path) -> Path:
+    path = tmp_path / "song.wav"
+    data = np.random.default_rng(0).standard_normal((1, 10 * SR)) * 0.3
+    save_audio(path, data.astype(np.float32), SR)
+    return path
+
+
+def _gen_kara_per_line(
+    lyrics: Lyrics, audio: Path, aligner: AbstractAligner, sample_rate: int
+) -> Lyrics:
+    """原先逐行切片、逐行对齐、原地修改深拷贝的写法，作为对照。"""
+    lyrics = deepcopy(lyrics)
+    vocal_np = preprocess(load_audio(audio, sample_rate=sample_rate)[0], sample_rate)
+    for idx, line in enumerate(lyrics.lines):
+        if len(line.content) != 1 or not (text := line.content[0].content):
+            continue
+        if text.startswith("作词"):
+            continue
+
+        start = ms2sample(line.start or 0, sample_rate)
+        end: int | None = None
+        if idx < len(lyrics.lines) - 1:
+            if line.end is not None:
+                end = ms2sample(line.end, sample_rate)
+            elif (next_line := lyrics.lines[idx + 1]).start is not None:
+                end = ms2sample(next_line.start, sample_rate)
+        if end is not None and start > end:
+            continue
+
+        words_kara: list[LyricWord] = []
+        iidx = 0
+        for word in aligner.align(vocal_np[start:end], text, sample_rate):
+            if not (pos := word.position):
+                continue
+            next_idx = text.find(word.word, iidx)
+            if next_idx == -1:
+                continue
+            if next_idx > iidx:
+                words_kara.append(
+                    LyricWord(
+                        start=words_kara[-1].end if words_kara else None,
+                        end=pos[0] + (line.start or 0),
+                        content=text[iidx:next_idx],
+                    )
+                )
+            words_kara.append(
+                LyricWord(
+                    start=pos[0] + (line.start or 0),
+                    end=pos[1] + (line.start or 0),
+                    content=word.word,
+                )
+            )
+            iidx = next_idx + len(word.word)
+        if tail := text[iidx:]:
+            words_kara.append(
+                LyricWord(
+                    start=words_kara[-1].end if words_kara else None,
+                    end=None,
+                    content=tail,
+                )
+            )
+        if words_kara and words_kara[-1].end is not None:
+            line.end = words_kara[-1].end
+            words_kara[-1].end = None
+        line.content = words_kara
+    return lyrics
+
+
+def test_gen_kara_matches_per_line(audio_file: Path) -> None:
+    lyrics = _lyrics()
+    aligner = _FakeAligner()
+
+    result = gen_kara(lyrics, audio_file, aligner, _FakeSeparator())
+
+    assert result == _gen_kara_per_line(lyrics, audio_file, aligner, SR)
+    # 确认真的做了对齐，而不是两边都原样返回
+    assert [w.content for w in result.lines[0].content] == ["hello", " ", "world"]
+    assert result.lines[4] == lyrics.lines[4]
+
+
+def test_gen_kara_leaves_input_untouched(audio_file: Path) -> None:
+    lyrics = _lyrics()
+    snapshot = deepcopy(lyrics)
+    lines = list(lyrics.lines)
+
+    result = gen_kara(lyrics, audio_file, _FakeAligner(), _FakeSeparator())
+
+    assert lyrics == snapshot
+    assert all(a is b for a, b in zip(lyrics.lines, lines))
+    assert result.lines is not lyrics.lines
+    assert result.metadata is not lyrics.metadata
+    assert result.lines[0] != lyrics.lines[0]
+
+
+def test_gen_kara_cache_hit_skips_separator(audio_file: Path, tmp_path: Path) -> None:
+    class _NoModelSeparator(_FakeSeparator):
+        # 真实分离器查询采样率时会加载模型，命中缓存时不应走到这里
+        @property
+        def samplerate(self) -> int:
+            pytest.fail("samplerate queried on a cache hit")
+
+    cache_dir = tmp_path / "cache"
+    first = _FakeSeparator()
+    expected = gen_kara(
+        _lyrics(), audio_file, _FakeAligner(), first, cache_dir=cache_dir
+    )
+    second = _NoModelSeparator()
+    result = gen_kara(
+        _lyrics(), audio_file, _FakeAligner(), second, cache_dir=cache_dir
+    )
+
+    assert first.calls == 1
+    assert second.calls == 0
+    assert result == expected
+
+
+class _UnusedSeparator(_FakeSeparator):
+    @property
+    def samplerate(self) -> int:
+        pytest.fail("separator should not be used")
+
+    def separate(self, audio: Any) -> dict[str, Any]:
+        pytest.fail("separator should not be used")
+
+
+@pytest.mark.parametrize(
+    ("lines", "target_lang"),
+    [
+        ([_line(0, None, "作词 : someone"), _line(1000, None, "")], None),
+        ([_line(0, None, "hello world"), _line(1000, None, "foo")], "ja"),
+        ([_line(3000, 1000, "hello world"), _line(5000, None, "")], None),
+    ],
+)
+def test_gen_kara_skips_separation_without_lines(
+    tmp_path: Path, lines: list[LyricLine], target_lang: Any
+) -> None:
+    lyrics = Lyrics(lines=lines)
+    # 音频文件不存在：只要尝试加载就会报错
+    result = gen_kara(
+        lyrics,
+        tmp_path / "missing.wav",
+        _FakeAligner(),
+        _UnusedSeparator(),
+        target_lang=target_lang,
+    )
+
+    assert result == lyrics
+
+
+def test_build_kara_line_uses_spans() -> None:
+    line = _line(1000, 5000, "la la la!")
+    words = [
+        AlignedWord("la", (0, 100), (0, 2)),
+        AlignedWord("la", None),
+        # 给出字符偏移时直接跳到第三个 la，而不是从当前位置查找
+        AlignedWord("la", (300, 400), (6, 8)),
+        AlignedWord("zz", (500, 600)),
+    ]
+
+    result = _build_kara_line(line, 0, "la la la!", words)
+
+    assert result.content == [
+        LyricWord(content="la", start=1000, end=1100),
+        LyricWord(content=" la ", start=1100, end=1300),
+        LyricWord(content="la", start=1300, end=1400),
+        LyricWord(content="!", start=1400, end=None),
+    ]
+    assert result.end == 5000
+    assert line == _line(1000, 5000, "la la la!")
+
+
+def test_build_kara_line_moves_last_end_to_line() -> None:
+    line = _line(1000, None, "foo bar")
+    words = [AlignedWord("foo", (0, 100)), AlignedWord("bar", (200, 300))]
+
+    result = _build_kara_line(line, 0, "foo bar", words)
+
+    assert result.content == [
+        LyricWord(content="foo", start=1000, end=1100),
+        LyricWord(content=" ", start=1100, end=1200),
+        LyricWord(content="bar", start=1200, end=None),
+    ]
+    assert result.end == 1300
+    assert line.end is None
+
+
+def test_separate_vocals_batches_misses(audio_file: Path, tmp_path: Path) -> None:
+    other = tmp_path / "other.wav"
+    data = np.random.default_rng(1).standard_normal((1, 3 * SR)) * 0.3
+    save_audio(other, data.astype(np.float32), SR)
+    cache_dir = tmp_path / "cache"
+
+    # 先只缓存其中一个，再一起分离：只有未命中的那个交给分离器
+    warm = _FakeSeparator()
+    separate_vocals([other], warm, cache_dir=cache_dir)
+    separator = _FakeSeparator()
+    vocals = separate_vocals([audio_file, other], separator, cache_dir=cache_dir)
+
+    assert warm.calls == 1
+    assert separator.calls == 1
+    for (vocal, sample_rate), path in zip(vocals, [audio_file, other]):
+        assert sample_rate == SR
+        np.testing.assert_array_equal(vocal, load_audio(path, sample_rate=SR))
+
+    # 不缓存时全部交给分离器
+    uncached = _FakeSeparator()
+    separate_vocals([audio_file, other], uncached)
+    assert uncached.calls == 2
+
+
+def test_gen_kara_uses_separated_vocals(audio_file: Path, tmp_path: Path) -> None:
+    cache_dir = tmp_path / "cache"
+    separate_vocals([audio_file], _FakeSeparator(), cache_dir=cache_dir)
+
+    # 批量分离后写入的缓存能被 gen_kara 直接命中
+    result = gen_kara(
+        _lyrics(), audio_file, _FakeAligner(), _UnusedSeparator(), cache_dir=cache_dir
+    )
+
+    assert result == gen_kara(_lyrics(), audio_file, _FakeAligner(), _FakeSeparator())
+
+
+def _bounds_per_line(
+    lines: list[LyricLine], sample_rate: int
+) -> tuple[list[int], list[int | None]]:
+    """原先逐行计算片段边界的写法，作为对照。"""
+    starts: list[int] = []
+    ends: list[int | None] = []
+    for idx, line in enumerate(lines):
+        end: int | None = None
+        if idx + 1 < len(lines):
+            if line.end is not None:
+                end = ms2sample(line.end, sample_rate)
+            elif (next_line := lines[idx + 1]).start is not None:
+                end = ms2sample(next_line.start, sample_rate)
+        starts.append(ms2sample(line.start or 0, sample_rate))
+        ends.append(end)
+    return starts, ends
+
+
+def _random_lines(rng: random.Random, n: int) -> list[LyricLine]:
+    def maybe_ms() -> int | None:
+        return None if rng.random() < 0.2 else rng.randrange(0, 600_000)
+
+    return [LyricLine(start=maybe_ms(), end=maybe_ms()) for _ in range(n)]
+
+
+def test_line_sample_bounds_matches_per_line() -> None:
+    rng = random.Random(0)
+    for n in (0, 1, 2, 50):
+        for sr in (16000, 44100):
+            lines = _random_lines(rng, n)
+            assert _line_sample_bounds(*_line_ms_bounds(lines), sr) == (
+                _bounds_per_line(lines, sr)
+            )
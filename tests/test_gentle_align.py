@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+from typing import Any
+
+import numpy as np
+import pytest
+
+from karakara.aligner.abc import AbstractAligner
+from karakara.aligner.gentle import GentleAligner
+from karakara.utils.io import ms2sample
+
+SR = 44100
+
+# 各词在整段音频中的绝对时间（秒），精度与 Gentle 一致（10ms 帧）
+WORD_TIMES: dict[str, tuple[float, float]] = {
+    "hello": (1.15, 1.42),
+    "world": (1.50, 1.87),
+    "foo": (2.39, 2.61),
+    "bar": (2.70, 3.03),
+    "spam": (5.01, 5.33),
+    "eggs": (5.47, 6.29),
+}
+# (行起始毫秒, 行文本)，起点刻意选在不落在整采样点上的毫秒值
+LINES: list[tuple[int, str]] = [
+    (1001, "hello world"),
+    (2347, "foo bar"),
+    (5003, "spam eggs"),
+]
+
+
+def _fake_submit(
+    audio: np.ndarray[Any, Any], text: str, sample_rate: int
+) -> list[dict[str, Any]]:
+    """模拟 Gentle：音频的值就是采样点序号，据此得知片段的起点，返回相对时间。"""
+    t0 = audio[0, 0] / sample_rate
+    words: list[dict[str, Any]] = []
+    pos = 0
+    for token in text.split():
+        offset = text.index(token, pos)
+        pos = offset + len(token)
+        start, end = WORD_TIMES[token]
+        words.append(
+            {
+                "word": token,
+                "case": "success",
+                "start": start - t0,
+                "end": end - t0,
+                "startOffset": offset,
+                "endOffset": pos,
+            }
+        )
+    return words
+
+
+@pytest.fixture
+def aligner(monkeypatch: pytest.MonkeyPatch) -> GentleAligner:
+    aligner = GentleAligner()
+    monkeypatch.setattr(aligner, "_submit", _fake_submit)
+    return aligner
+
+
+def _segments() -> list[tuple[int, int | None, str]]:
+    starts = [ms2sample(ms, SR) for ms, _ in LINES]
+    ends: list[int | None] = [*starts[1:], None]
+    return [(s, e, text) for s, e, (_, text) in zip(starts, ends, LINES)]
+
+
+def test_align_many_matches_per_line(aligner: GentleAligner) -> None:
+    audio = np.arange(7 * SR, dtype=np.float64).reshape(1, -1)
+    segments = _segments()
+
+    many = aligner.align_many(audio, segments, SR)
+    per_line = AbstractAligner.align_many(aligner, audio, segments, SR)
+
+    assert many == per_line
+
+
+def test_align_many_absolute_times(aligner: GentleAligner) -> None:
+    audio = np.arange(7 * SR, dtype=np.float64).reshape(1, -1)
+
+    result = aligner.align_many(audio, _segments(), SR)
+
+    for (line_start, text), words in zip(LINES, result):
+        assert [w.word for w in words] == text.split()
+        for w in words:
+            assert w.position is not None
+            start, end = WORD_TIMES[w.word]
+            # 加回行起点后应得到原始绝对时间，不能差 1ms
+            assert w.position[0] + line_start == round(start * 1000)
+            assert w.position[1] + line_start == round(end * 1000)
+            assert w.span is not None
+            assert text[w.span[0] : w.span[1]] == w.word
+
+
+def test_missing_offsets(
+    aligner: GentleAligner, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    def submit_without_offsets(
+        audio: np.ndarray[Any, Any], text: str, sample_rate: int
+    ) -> list[dict[str, Any]]:
+        words = _fake_submit(audio, text, sample_rate)
+        for w in words:
+            del w["startOffset"], w["endOffset"]
+        return words
+
+    monkeypatch.setattr(aligner, "_submit", submit_without_offsets)
+    audio = np.arange(7 * SR, dtype=np.float64).reshape(1, -1)
+
+    words = aligner.align(audio, "hello world", SR)
+    assert [w.span for w in words] == [None, None]
+
+    # 没有偏移时按时间归入各行
+    result = aligner.align_many(audio, _segments(), SR)
+    assert [[w.word for w in ws] for ws in result] == [t.split() for _, t in LINES]
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import time
+from io import BytesIO
+from typing import IO, Any
+
+import pytest
+import requests
+
+from karakara.aligner.gentle.client import GentleClient
+
+
+class _FakeResponse:
+    status_code = 200
+
+    def __init__(self, status: str) -> None:
+        self.content = f'{{"status": "{status}"}}'.encode()
+
+
+class _FakeSession:
+    """按脚本返回状态或抛出异常；每次请求推进假时钟，模拟服务端是否挂起了请求。"""
+
+    def __init__(
+        self, clock: list[float], script: list[tuple[float, str | Exception]]
+    ) -> None:
+        self._clock = clock
+        self._script = script
+        self.calls: list[dict[str, Any] | None] = []
+
+    def get(
+        self, url: str, params: dict[str, Any] | None = None, timeout: Any = None
+    ) -> _FakeResponse:
+        self.calls.append(params)
+        elapsed, status = self._script.pop(0)
+        self._clock[0] += elapsed
+        if isinstance(status, Exception):
+            raise status
+        return _FakeResponse(status)
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> list[float]:
+    clock = [0.0]
+    monkeypatch.setattr(time, "time", lambda: clock[0])
+    monkeypatch.setattr(time, "sleep", lambda s: clock.__setitem__(0, clock[0] + s))
+    return clock
+
+
+def test_long_poll_survives_early_wakeup(clock: list[float]) -> None:
+    session = _FakeSession(
+        clock,
+        [(30.0, "QUEUED"), (0.1, "TRANSCRIBING"), (30.0, "TRANSCRIBING"), (5.0, "OK")],
+    )
+    client = GentleClient(session=session)  # type: ignore[arg-type]
+
+    status = client.poll_status("uid", long_poll=True, long_poll_wait=30.0)
+
+    assert status["status"] == "OK"
+    # 第二次的提前返回是状态变化，不应关闭长轮询
+    assert all(params is not None for params in session.calls)
+
+
+def test_long_poll_falls_back_when_ignored(clock: list[float]) -> None:
+    session = _FakeSession(clock, [(0.1, "QUEUED"), (0.1, "QUEUED"), (0.1, "OK")])
+    client = GentleClient(session=session)  # type: ignore[arg-type]
+
+    status = client.poll_status("uid", long_poll=True, long_poll_wait=30.0)
+
+    assert status["status"] == "OK"
+    assert session.calls[0] is not None
+    assert session.calls[1:] == [None, None]
+
+
+@pytest.mark.parametrize("long_poll", [False, True])
+def test_poll_retries_after_timeout(clock: list[float], long_poll: bool) -> None:
+    session = _FakeSession(
+        clock,
+        [
+            (35.0, requests.ReadTimeout("read timed out")),
+            (0.1, requests.ConnectionError("connection reset")),
+            (0.1, "OK"),
+        ],
+    )
+    client = GentleClient(session=session)  # type: ignore[arg-type]
+
+    status = client.poll_status("uid", long_poll=long_poll, long_poll_wait=30.0)
+
+    assert status["status"] == "OK"
+    assert len(session.calls) == 3
+
+
+class _RecordingSession:
+    """把 post 的参数交给 requests 准备成真实请求，记录请求头和完整请求体。"""
+
+    def __init__(self) -> None:
+        self.headers: dict[str, str] = {}
+        self.body = b""
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        kwargs.pop("timeout", None)
+        prepared = requests.Request("POST", url, **kwargs).prepare()
+        self.headers = dict(prepared.headers)
+        body = prepared.body
+        self.body = body if isinstance(body, bytes) else body.read()  # type: ignore[union-attr]
+        resp = requests.Response()
+        resp.status_code = 200
+        resp._content = b'{"words": []}'
+        return resp
+
+
+@pytest.mark.parametrize("kind", ["bytes", "bytearray", "file"])
+def test_multipart_upload_streams_full_payload(kind: str) -> None:
+    toolbelt = pytest.importorskip("requests_toolbelt")
+    payload = bytes(range(256)) * 1000
+    fileobj: IO[bytes] | bytes | bytearray = {
+        "bytes": payload,
+        "bytearray": bytearray(payload),
+        "file": BytesIO(payload),
+    }[kind]
+    session = _RecordingSession()
+    client = GentleClient(session=session)  # type: ignore[arg-type]
+
+    client.submit_file_sync(
+        fileobj, filename="a.wav", transcript="hello", content_type="audio/wav"
+    )
+
+    assert int(session.headers["Content-Length"]) == len(session.body)
+    decoder = toolbelt.MultipartDecoder(session.body, session.headers["Content-Type"])
+    parts = {
+        part.headers[b"Content-Disposition"].split(b'name="')[1].split(b'"')[0]: part
+        for part in decoder.parts
+    }
+    assert parts[b"audio"].content == payload
+    assert parts[b"audio"].headers[b"Content-Type"] == b"audio/wav"
+    assert parts[b"transcript"].content == b"hello"
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import wave
+from io import BytesIO
+
+import av
+import numpy as np
+import pytest
+
+from karakara.utils.io import (
+    _SampleBuffer,
+    encode_flac,
+    encode_wav,
+    ms2sample,
+    sample2ms,
+    save_audio,
+)
+
+
+def _read_wav(buf: bytes) -> tuple[tuple[int, int, int, int], bytes]:
+    with wave.open(BytesIO(buf), "rb") as w:
+        params = (w.getnchannels(), w.getsampwidth(), w.getframerate(), w.getnframes())
+        return params, w.readframes(w.getnframes())
+
+
+@pytest.mark.parametrize("channels", [1, 2])
+@pytest.mark.parametrize("n", [1, 1000, 70000])
+def test_encode_wav_matches_save_audio(channels: int, n: int) -> None:
+    rng = np.random.default_rng(n)
+    # 含超出 [-1, 1] 的值，检验裁剪
+    data = (rng.standard_normal((channels, n)) * 0.6).astype(np.float32)
+
+    out = BytesIO()
+    save_audio(out, data, 16000)
+
+    assert _read_wav(bytes(encode_wav(data, 16000))) == _read_wav(out.getvalue())
+
+
+def test_encode_flac_matches_wav() -> None:
+    soundfile = pytest.importorskip("soundfile")
+    rng = np.random.default_rng(0)
+    # 响度归一化后峰值常超出 [-1, 1]，FLAC 必须与 WAV 同样裁剪
+    data = (rng.standard_normal((2, 5000)) * 0.8).astype(np.float32)
+    data[:, :4] = [[1.5, -1.5, 1.0, -1.0], [3.0, -3.0, 0.5, -0.5]]
+
+    pcm, sample_rate = soundfile.read(
+        BytesIO(encode_flac(data, 16000)), dtype="int16", always_2d=True
+    )
+    params, frames = _read_wav(bytes(encode_wav(data, 16000)))
+
+    assert sample_rate == 16000
+    assert pcm.shape == (params[3], params[0])
+    assert pcm.tobytes() == frames
+
+
+def test_encode_wav_rounds() -> None:
+    data = np.array([[1.0, -1.0, 2.0, 0.6 / 32767, -0.6 / 32767]], dtype=np.float32)
+
+    _, frames = _read_wav(bytes(encode_wav(data, 16000)))
+
+    assert np.frombuffer(frames, dtype="<i2").tolist() == [32767, -32767, 32767, 1, -1]
+
+
+def test_ms_sample_conversion() -> None:
+    for sr in (16000, 44100, 48000):
+        for ms in range(0, 5000, 7):
+            assert ms2sample(ms, sr) == ms * sr // 1000
+            assert sample2ms(ms2sample(ms, sr), sr) <= ms
+    assert isinstance(sample2ms(44100.0, 44100), int)  # type: ignore[arg-type]
+
+
+def test_sample_buffer_grows() -> None:
+    rng = np.random.default_rng(0)
+    chunks = [rng.standard_normal((2, n)).astype(np.float32) for n in (5, 300, 1, 64)]
+    buffer = _SampleBuffer(capacity=16)
+    assert buffer.result() is None
+
+    for chunk in chunks:
+        frame = av.AudioFrame.from_ndarray(chunk, format="fltp", layout="stereo")
+        buffer.append(frame)
+
+    result = buffer.result()
+    assert result is not None
+    np.testing.assert_array_equal(result, np.concatenate(chunks, axis=1))
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import random
+import re
+from pathlib import Path
+
+import pytest
+
+from karakara.utils.lang import _VECTORIZE_MIN_LEN, detect_lang
+
+SAMPLES = Path(__file__).parent.parent / "samples"
+
+# 原先基于正则的实现，作为对照
+_JA_PATTERN = re.compile(r"[\u3040-\u309F\u30A0-\u30FF]")
+_ZH_PATTERN = re.compile(r"[\u4E00-\u9FFF]")
+_EN_PATTERN = re.compile(r"[A-Za-z]")
+
+
+def _detect_lang_regex(s: str) -> str | None:
+    counts = {
+        "ja": len(_JA_PATTERN.findall(s)),
+        "zh": len(_ZH_PATTERN.findall(s)),
+        "en": len(_EN_PATTERN.findall(s)),
+    }
+    max_lang = max(counts, key=counts.__getitem__)
+    return max_lang if counts[max_lang] else None
+
+
+# 各类字符：ASCII、假名、汉字、区间边界附近的字符、韩文、全角标点、emoji
+_ALPHABET = (
+    "abcXYZ019 ,.!?'@[`{あいうアイウーヽ぀ゟ゠ヿ㄀中文汉字一鿿䷿ꀀ한국어，。「」😀é"
+)
+
+
+def _random_strings(n: int) -> list[str]:
+    rng = random.Random(0)
+    lengths = [0, 1, 2, _VECTORIZE_MIN_LEN - 1, _VECTORIZE_MIN_LEN, 200]
+    return [
+        "".join(rng.choices(_ALPHABET, k=rng.choice(lengths) or rng.randint(0, 100)))
+        for _ in range(n)
+    ]
+
+
+@pytest.mark.parametrize("s", _random_strings(500))
+def test_matches_regex_implementation(s: str) -> None:
+    assert detect_lang(s) == _detect_lang_regex(s)
+
+
+def test_sample_lyrics() -> None:
+    lines = [
+        line
+        for path in SAMPLES.glob("*.lrc")
+        for line in path.read_text(encoding="utf-8").splitlines()
+    ]
+    assert lines
+    for line in lines:
+        assert detect_lang(line) == _detect_lang_regex(line), line